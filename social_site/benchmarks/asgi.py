@@ -0,0 +1,233 @@
+"""WSGI против ASGI при медленных клиентах.
+
+Запуск из каталога ``social_site`` против базы из ``benchmarks.seed``::
+
+    python -m benchmarks.asgi /tmp/bench/db.sqlite3 --clients 64 \\
+        --threads 8 --client-delay 50
+
+Каждый из ``--clients`` клиентов в цикле запрашивает ленты (``index``,
+``group_posts``, ``profile``, ``post_view``, ``follow_index``) и медленно
+забирает ответ: ``--client-delay`` мс на каждые 64 КиБ тела. Сравниваются
+три режима, каждый в отдельном процессе:
+
+* ``wsgi`` — ``social_site.wsgi.application`` в пуле из ``--threads``
+  потоков, как gunicorn с gthread: пока клиент читает ответ, поток занят;
+* ``asgi-sync`` — ``social_site.asgi.application`` с синхронными вьюхами;
+* ``asgi-async`` — то же с асинхронными вьюхами (``ASYNC_VIEWS``).
+
+Кэш страниц по умолчанию выключен, чтобы мерить сами вьюхи.
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from .load import build_request, git_commit, summarize, wsgi_environ
+from .seed import manifest_path, setup
+
+MODES = ("wsgi", "asgi-sync", "asgi-async")
+SCENARIOS = ("index", "group_posts", "profile", "post_view", "follow_index")
+WEIGHTS = (30, 15, 15, 25, 15)
+CHUNK = 2 ** 16
+
+
+def session_cookie(username):
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    client = Client()
+    client.force_login(get_user_model().objects.get(username=username))
+    return f"sessionid={client.cookies['sessionid'].value}"
+
+
+def next_request(manifest, rng, cookie):
+    name = rng.choices(SCENARIOS, WEIGHTS)[0]
+    _, path, params = build_request(name, manifest, rng)
+    headers = {"Cookie": cookie} if name == "follow_index" else {}
+    return name, path, urlencode(params or {}), headers
+
+
+def run_wsgi(options, manifest, cookie, deadline):
+    from social_site.wsgi import application
+
+    delay = options["client_delay"] / 1000
+    pool = ThreadPoolExecutor(max_workers=options["threads"])
+
+    def serve(path, query, headers):
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response["status"] = int(status.split()[0])
+
+        result = application(wsgi_environ("GET", path, query, b"", headers),
+                             start_response)
+        try:
+            size = sum(len(chunk) for chunk in result)
+        finally:
+            result.close()
+        # Поток сервера отдаёт тело медленному клиенту.
+        time.sleep(delay * max(1, math.ceil(size / CHUNK)))
+        return response["status"]
+
+    samples = []
+
+    def client(index):
+        rng = random.Random(options["seed"] + index)
+        while time.perf_counter() < deadline:
+            name, path, query, headers = next_request(manifest, rng, cookie)
+            started = time.perf_counter()
+            status = pool.submit(serve, path, query, headers).result()
+            samples.append((name, status,
+                            (time.perf_counter() - started) * 1000, None))
+
+    threads = [threading.Thread(target=client, args=(i,))
+               for i in range(options["clients"])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.shutdown()
+    return samples
+
+
+def run_asgi(options, manifest, cookie, deadline):
+    from social_site.asgi import application
+
+    delay = options["client_delay"] / 1000
+
+    async def serve(path, query, headers):
+        response = {}
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"localhost")] + [
+                (name.lower().encode(), value.encode())
+                for name, value in headers.items()
+            ],
+            "client": ("10.0.0.1", 40000),
+            "server": ("localhost", 80),
+        }
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": b"",
+                        "more_body": False}
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message.get("body"):
+                # Цикл событий свободен, пока клиент читает ответ.
+                await asyncio.sleep(delay)
+
+        await application(scope, receive, send)
+        return response["status"]
+
+    samples = []
+
+    async def client(index):
+        rng = random.Random(options["seed"] + index)
+        while time.perf_counter() < deadline:
+            name, path, query, headers = next_request(manifest, rng, cookie)
+            started = time.perf_counter()
+            status = await serve(path, query, headers)
+            samples.append((name, status,
+                            (time.perf_counter() - started) * 1000, None))
+
+    async def main():
+        await asyncio.gather(*(client(i) for i in range(options["clients"])))
+
+    asyncio.run(main())
+    return samples
+
+
+def worker(mode, options, results):
+    if mode == "asgi-async":
+        os.environ["ASYNC_VIEWS"] = ",".join(SCENARIOS)
+    setup(options["db"])
+    from django.conf import settings
+
+    if not options["page_cache"]:
+        settings.PAGE_CACHE_TIMEOUT = 0
+    with open(manifest_path(options["db"])) as source:
+        manifest = json.load(source)
+    cookie = session_cookie(manifest["users"][0])
+    deadline = time.perf_counter() + options["duration"]
+    run = run_wsgi if mode == "wsgi" else run_asgi
+    started = time.perf_counter()
+    samples = run(options, manifest, cookie, deadline)
+    results.put(summarize(samples, time.perf_counter() - started))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db", help="база SQLite из benchmarks.seed")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=8,
+                        help="потоков WSGI-сервера")
+    parser.add_argument("--client-delay", type=float, default=50,
+                        help="мс на чтение клиентом 64 КиБ ответа")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--page-cache", action="store_true",
+                        help="не выключать кэш страниц")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    args = parser.parse_args()
+
+    options = {
+        "db": os.path.abspath(args.db),
+        "clients": args.clients,
+        "threads": args.threads,
+        "client_delay": args.client_delay,
+        "duration": args.duration,
+        "page_cache": args.page_cache,
+        "seed": args.seed,
+    }
+    context = multiprocessing.get_context("spawn")
+    modes = {}
+    for mode in args.modes.split(","):
+        if mode not in MODES:
+            parser.error(f"неизвестный режим {mode}")
+        results = context.Queue()
+        process = context.Process(target=worker,
+                                  args=(mode, options, results))
+        process.start()
+        modes[mode] = results.get()
+        process.join()
+
+    print(f"{'режим':12} {'запросов':>8} {'ошибок':>7} {'rps':>8} "
+          f"{'p50':>8} {'p95':>8} {'p99':>8}")
+    for mode, stats in modes.items():
+        print(f"{mode:12} {stats['requests']:8} {stats['errors']:7} "
+              f"{stats['rps']:8.2f} {stats['p50_ms']:8.2f} "
+              f"{stats['p95_ms']:8.2f} {stats['p99_ms']:8.2f}")
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"commit": git_commit(),
+                       "options": {key: value for key, value in
+                                   options.items() if key != "db"},
+                       "modes": modes},
+                      output, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
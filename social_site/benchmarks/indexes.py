@@ -0,0 +1,190 @@
+"""Планы запросов и тайминги лент до и после миграции с индексами.
+
+Запуск из каталога ``social_site``::
+
+    python -m benchmarks.indexes --posts 1000000
+
+Скрипт создаёт отдельную временную базу SQLite со всеми миграциями,
+удаляет индексы миграции ``INDEXES``, наполняет базу данными и замеряет
+запросы, затем создаёт индексы заново и повторяет замеры. Откат миграций
+не подходит: запросы ``Post.objects.feed()`` читают колонки, которые
+добавлены после ``INDEXES``.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+INDEXES = "0017_feed_indexes"
+
+
+def setup_django(db_path):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_site.settings")
+    from django.conf import settings
+    settings.DATABASES["default"]["NAME"] = db_path
+    import django
+    django.setup()
+
+
+def seed(posts, users, groups, comments, follows, rng):
+    """Быстрое наполнение сырыми INSERT: сигналы моделей не нужны."""
+    from django.db import connection, transaction
+
+    start = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO auth_user (id, password, is_superuser, username, "
+            "first_name, last_name, email, is_staff, is_active, date_joined) "
+            "VALUES (%s, '', 0, %s, '', '', '', 0, 1, %s)",
+            [(i, f"user{i}", start) for i in range(1, users + 1)],
+        )
+        cursor.executemany(
+            "INSERT INTO posts_group (id, title, slug, description) "
+            "VALUES (%s, %s, %s, '')",
+            [(i, f"Группа {i}", f"group-{i}") for i in range(1, groups + 1)],
+        )
+        batch = []
+        for i in range(1, posts + 1):
+            batch.append((
+                i,
+                f"Пост {i}",
+                start + timedelta(seconds=i * 30),
+                rng.randint(1, users),
+                rng.randint(1, groups) if rng.random() < 0.7 else None,
+            ))
+            if len(batch) == 10000:
+                _insert_posts(cursor, batch)
+                batch = []
+        _insert_posts(cursor, batch)
+        cursor.executemany(
+            "INSERT INTO posts_comment (post_id, author_id, text, created) "
+            "VALUES (%s, %s, 'Комментарий', %s)",
+            [(rng.randint(1, posts),
+              rng.randint(1, users),
+              start + timedelta(seconds=i)) for i in range(comments)],
+        )
+        edges = set()
+        while len(edges) < follows:
+            user_id, author_id = rng.randint(1, users), rng.randint(1, users)
+            if user_id != author_id:
+                edges.add((user_id, author_id))
+        cursor.executemany(
+            "INSERT INTO posts_follow (user_id, author_id) VALUES (%s, %s)",
+            sorted(edges),
+        )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def _insert_posts(cursor, batch):
+    cursor.executemany(
+        "INSERT INTO posts_post (id, text, pub_date, updated, author_id, "
+        "group_id, comment_count, image_variants, views) "
+        "VALUES (%s, %s, %s, %s, %s, %s, 0, '', 0)",
+        [(pk, text, pub_date, pub_date, author_id, group_id)
+         for pk, text, pub_date, author_id, group_id in batch],
+    )
+
+
+def measured_indexes():
+    """Пары (модель, индекс) из миграции ``INDEXES``."""
+    from django.apps import apps
+    from django.db.migrations.loader import MigrationLoader
+
+    migration = MigrationLoader(None).get_migration("posts", INDEXES)
+    result = []
+    for operation in migration.operations:
+        model = apps.get_model("posts", operation.model_name)
+        result.append((model, operation.index))
+    return result
+
+
+def access_paths(users, groups, posts):
+    from posts.models import Comment, Follow, Post
+
+    return {
+        "index": lambda: Post.objects.feed()[:10],
+        "index deep page": lambda: Post.objects.feed()[posts // 2:
+                                                       posts // 2 + 10],
+        "group": lambda: Post.objects.feed().filter(group=groups // 2)[:10],
+        "profile": lambda: Post.objects.feed().filter(author=users // 2)[:10],
+        "profile count": lambda: Post.objects.filter(author=users // 2),
+        "comments": lambda: Comment.objects.filter(post=posts // 2),
+        "followers": lambda: Follow.objects.filter(
+            author=users // 2
+        ).values_list("user_id", flat=True),
+    }
+
+
+def measure(paths, repeat):
+    results = {}
+    for name, build in paths.items():
+        plan = build().explain()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            if name.endswith("count"):
+                build().count()
+            else:
+                list(build())
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = (plan, statistics.median(timings))
+    return results
+
+
+def report(title, results):
+    print(f"\n=== {title} ===")
+    for name, (plan, median_ms) in results.items():
+        print(f"\n-- {name}: {median_ms:.2f} ms")
+        print(plan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--groups", type=int, default=100)
+    parser.add_argument("--comments", type=int, default=200000)
+    parser.add_argument("--follows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, "bench.sqlite3"))
+        from django.core.management import call_command
+        from django.db import connection
+
+        call_command("migrate", verbosity=0)
+        indexes = measured_indexes()
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.remove_index(model, index)
+        print(f"Наполнение: {args.posts} постов...")
+        seed(args.posts, args.users, args.groups, args.comments,
+             args.follows, random.Random(args.seed))
+
+        paths = access_paths(args.users, args.groups, args.posts)
+        before = measure(paths, args.repeat)
+        report(f"Без индексов {INDEXES}", before)
+
+        started = time.perf_counter()
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.add_index(model, index)
+        print(f"\nИндексы {INDEXES}: {time.perf_counter() - started:.1f} s")
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        after = measure(paths, args.repeat)
+        report(f"С индексами {INDEXES}", after)
+
+        print("\n=== Итого, медиана, ms ===")
+        for name in paths:
+            print(f"{name:20} {before[name][1]:10.2f} {after[name][1]:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
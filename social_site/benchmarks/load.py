@@ -0,0 +1,408 @@
+"""Нагрузочный драйвер для представлений лент, постов и комментариев.
+
+Запуск из каталога ``social_site`` против базы из ``benchmarks.seed``::
+
+    python -m benchmarks.load /tmp/bench/db.sqlite3 --processes 4 \\
+        --duration 30 --output before.json
+
+По умолчанию каждый процесс вызывает ``social_site.wsgi.application``
+в себе. С ``--url http://127.0.0.1:8000`` запросы идут по HTTP в уже
+запущенный сервер (база та же, манифест берётся рядом с ней); число SQL
+запросов в этом режиме не известно. Результаты — p50/p95/p99 задержки,
+запросы в секунду и SQL на запрос по каждому представлению — пишутся в
+JSON вместе с коммитом; два файла сравниваются так::
+
+    python -m benchmarks.load --compare before.json after.json
+"""
+import argparse
+import http.client
+import json
+import math
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from io import BytesIO
+from urllib.parse import urlencode, urlsplit
+
+from .seed import manifest_path, setup
+
+# Представление -> (вес в смеси, нужен ли вход).
+SCENARIOS = {
+    "index": (30, False),
+    "group_posts": (15, False),
+    "profile": (15, False),
+    "post_view": (25, False),
+    "follow_index": (10, True),
+    "add_comment": (5, True),
+}
+OK_STATUSES = {200, 302}
+
+
+def wsgi_environ(method, path, query, body, headers):
+    environ = {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "REMOTE_ADDR": "10.0.0.1",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": False,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in headers.items():
+        key = name.upper().replace("-", "_")
+        if key != "CONTENT_TYPE":
+            key = f"HTTP_{key}"
+        environ[key] = value
+    return environ
+
+
+class WSGITransport:
+    """Вызывает WSGI-приложение в текущем процессе и считает SQL."""
+
+    def __init__(self):
+        from django.db import connection
+        from social_site.wsgi import application
+
+        self.application = application
+        self.connection = connection
+
+    def request(self, method, path, query, body, headers):
+        environ = wsgi_environ(method, path, query, body, headers)
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response["status"] = int(status.split()[0])
+            response["headers"] = response_headers
+
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with self.connection.execute_wrapper(count):
+            result = self.application(environ, start_response)
+            try:
+                for _ in result:
+                    pass
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+        return response["status"], response["headers"], len(queries)
+
+
+class HTTPTransport:
+    """Ходит по HTTP в запущенный сервер через keep-alive соединение."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.connection = None
+
+    def request(self, method, path, query, body, headers):
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port,
+                                                         timeout=30)
+        target = f"{path}?{query}" if query else path
+        try:
+            self.connection.request(method, target, body=body or None,
+                                    headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            self.connection.close()
+            self.connection = None
+            raise
+        return response.status, response.getheaders(), None
+
+
+class Client:
+    """Клиент с cookie поверх транспорта."""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.cookies = {}
+
+    def request(self, method, path, params=None):
+        query = body = ""
+        headers = {}
+        if method == "POST":
+            params = dict(params or {})
+            params["csrfmiddlewaretoken"] = self.cookies.get("csrftoken", "")
+            body = urlencode(params)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+            headers["Referer"] = "http://localhost/"
+        elif params:
+            query = urlencode(params)
+        if self.cookies:
+            headers["Cookie"] = "; ".join(
+                f"{name}={value}" for name, value in self.cookies.items()
+            )
+        status, response_headers, queries = self.transport.request(
+            method, path, query, body.encode(), headers
+        )
+        for name, value in response_headers:
+            if name.lower() == "set-cookie":
+                for morsel in SimpleCookie(value).values():
+                    self.cookies[morsel.key] = morsel.value
+        return status, queries
+
+    def login(self, username, password):
+        self.request("GET", "/auth/login/")
+        status, _ = self.request("POST", "/auth/login/",
+                                 {"username": username, "password": password})
+        if status != 302:
+            raise RuntimeError(f"Не удалось войти как {username}: {status}")
+
+
+def build_request(name, manifest, rng):
+    """``(method, path, params)`` для очередного запроса к представлению."""
+    if name == "index":
+        return "GET", "/", {"page": rng.choice((1, 1, 1, 2, 3))}
+    if name == "group_posts":
+        return "GET", f"/group/{rng.choice(manifest['groups'])}", None
+    if name == "profile":
+        return "GET", f"/{rng.choice(manifest['users'])}/", None
+    username, post_id = rng.choice(manifest["posts"])
+    if name == "post_view":
+        return "GET", f"/{username}/{post_id}/", None
+    if name == "follow_index":
+        return "GET", "/follow/", None
+    if name == "add_comment":
+        return "POST", f"/{username}/{post_id}/comment", {
+            "text": f"Нагрузочный комментарий {rng.random()}",
+        }
+    raise ValueError(name)
+
+
+def drive(anonymous, authenticated, manifest, scenarios, rng,
+          requests=None, deadline=None):
+    """Шлёт запросы до ``requests`` штук или до момента ``deadline``.
+
+    Возвращает список ``(представление, статус, мс, SQL запросов)``.
+    """
+    names = list(scenarios)
+    weights = [SCENARIOS[name][0] for name in names]
+    samples = []
+    while True:
+        if requests is not None and len(samples) >= requests:
+            break
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        name = rng.choices(names, weights)[0]
+        client = authenticated if SCENARIOS[name][1] else anonymous
+        method, path, params = build_request(name, manifest, rng)
+        started = time.perf_counter()
+        try:
+            status, queries = client.request(method, path, params)
+        except (http.client.HTTPException, OSError):
+            status, queries = None, None
+        samples.append((name, status, (time.perf_counter() - started) * 1000,
+                        queries))
+    return samples
+
+
+def worker(index, options, barrier, results):
+    rng = random.Random(options["seed"] + index)
+    with open(manifest_path(options["db"])) as source:
+        manifest = json.load(source)
+    if options["url"]:
+        def make_client():
+            return Client(HTTPTransport(options["url"]))
+    else:
+        setup(options["db"])
+        transport = WSGITransport()
+
+        def make_client():
+            return Client(transport)
+    anonymous, authenticated = make_client(), make_client()
+    authenticated.login(manifest["users"][index % len(manifest["users"])],
+                        manifest["password"])
+    drive(anonymous, authenticated, manifest, options["scenarios"], rng,
+          requests=options["warmup"])
+    barrier.wait()
+    deadline = None
+    if options["duration"]:
+        deadline = time.perf_counter() + options["duration"]
+    results.put(drive(anonymous, authenticated, manifest,
+                      options["scenarios"], rng,
+                      requests=options["requests"], deadline=deadline))
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    if not values:
+        return None
+    rank = max(1, math.ceil(share * len(values)))
+    return round(values[rank - 1], 3)
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(ms for _, _, ms, _ in samples)
+    queries = [count for _, _, _, count in samples if count is not None]
+    return {
+        "requests": len(samples),
+        "errors": sum(status not in OK_STATUSES
+                      for _, status, _, _ in samples),
+        "rps": round(len(samples) / elapsed, 2) if elapsed else None,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "queries_per_request": (round(sum(queries) / len(queries), 2)
+                                if queries else None),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(options):
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(options["processes"] + 1)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(i, options, barrier, results))
+        for i in range(options["processes"])
+    ]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    started = time.perf_counter()
+    samples = []
+    for _ in processes:
+        samples.extend(results.get())
+    elapsed = time.perf_counter() - started
+    for process in processes:
+        process.join()
+
+    with open(manifest_path(options["db"])) as source:
+        manifest = json.load(source)
+    return {
+        "commit": git_commit(),
+        "started": datetime.now(timezone.utc).isoformat(),
+        "mode": "http" if options["url"] else "wsgi",
+        "options": {key: value for key, value in options.items()
+                    if key != "db"},
+        "data": {"scale": manifest.get("scale"), **manifest["counts"]},
+        "elapsed_s": round(elapsed, 3),
+        "total": summarize(samples, elapsed),
+        "views": {
+            name: summarize([s for s in samples if s[0] == name], elapsed)
+            for name in options["scenarios"]
+        },
+    }
+
+
+def report(result):
+    print(f"Коммит {result['commit']}, режим {result['mode']}, "
+          f"{result['elapsed_s']} s")
+    print(f"\n{'представление':14} {'запросов':>8} {'ошибок':>7} "
+          f"{'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL':>6}")
+    rows = [*result["views"].items(), ("итого", result["total"])]
+    for name, stats in rows:
+        print(f"{name:14} {stats['requests']:8} {stats['errors']:7} "
+              + " ".join(_cell(stats[key], width)
+                         for key, width in (("rps", 8), ("p50_ms", 8),
+                                            ("p95_ms", 8), ("p99_ms", 8),
+                                            ("queries_per_request", 6))))
+
+
+def _cell(value, width):
+    if value is None:
+        return f"{'-':>{width}}"
+    return f"{value:{width}.2f}"
+
+
+def compare(before_path, after_path):
+    with open(before_path) as source:
+        before = json.load(source)
+    with open(after_path) as source:
+        after = json.load(source)
+    print(f"{before['commit']} -> {after['commit']}")
+    keys = ("rps", "p50_ms", "p95_ms", "p99_ms", "queries_per_request")
+    print(f"\n{'представление':14} " + " ".join(f"{key:>22}" for key in keys))
+    names = [name for name in after["views"] if name in before["views"]]
+    for name in [*names, "total"]:
+        old = before["total"] if name == "total" else before["views"][name]
+        new = after["total"] if name == "total" else after["views"][name]
+        cells = []
+        for key in keys:
+            if old[key] is None or new[key] is None:
+                cells.append(f"{'-':>22}")
+                continue
+            change = ((new[key] - old[key]) / old[key] * 100 if old[key]
+                      else 0.0)
+            cells.append(f"{old[key]:8.2f} {new[key]:8.2f} {change:+4.0f}%")
+        print(f"{name:14} " + " ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db", nargs="?",
+                        help="база SQLite из benchmarks.seed")
+    parser.add_argument("--url", help="адрес запущенного сервера")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--duration", type=float, default=30,
+                        help="секунд на замер; 0 - до --requests")
+    parser.add_argument("--requests", type=int,
+                        help="запросов на процесс")
+    parser.add_argument("--warmup", type=int, default=20,
+                        help="запросов на процесс до замера")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help="представления через запятую")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="сравнить два файла результатов")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if not args.db:
+        parser.error("нужен путь к базе")
+    scenarios = args.scenarios.split(",")
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"неизвестные представления: {', '.join(unknown)}")
+    if not args.duration and not args.requests:
+        parser.error("нужен --duration или --requests")
+    result = run({
+        "db": os.path.abspath(args.db),
+        "url": args.url,
+        "processes": args.processes,
+        "duration": args.duration,
+        "requests": args.requests,
+        "warmup": args.warmup,
+        "scenarios": scenarios,
+        "seed": args.seed,
+    })
+    report(result)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(result, output, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Поиск FTS5 против ``LIKE '%...%'`` на сгенерированном корпусе.
+
+Запуск из каталога ``social_site``::
+
+    python -m benchmarks.search --posts 200000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from .indexes import setup_django
+
+
+SYLLABLES = ["ко", "ра", "ми", "ло", "на", "те", "су", "да", "ві", "пе",
+             "ка", "бо", "ру", "ле", "зо", "ти"]
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES)
+                          for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def seed(posts, comments, words, rng):
+    from django.db import connection, transaction
+
+    start = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    # Частоты слов по закону Ципфа, как в живом тексте.
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+
+    def text():
+        return " ".join(rng.choices(words, weights, k=rng.randint(8, 40)))
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO auth_user (id, password, is_superuser, username, "
+            "first_name, last_name, email, is_staff, is_active, date_joined) "
+            "VALUES (1, '', 0, 'bench', '', '', '', 0, 1, %s)",
+            [start],
+        )
+        cursor.executemany(
+            "INSERT INTO posts_post (id, text, pub_date, updated, author_id, "
+            "comment_count, image_variants, views) "
+            "VALUES (%s, %s, %s, %s, 1, 0, '', 0)",
+            [(i, text(), start + timedelta(seconds=i),
+              start + timedelta(seconds=i)) for i in range(1, posts + 1)],
+        )
+        cursor.executemany(
+            "INSERT INTO posts_comment (post_id, author_id, text, created) "
+            "VALUES (%s, 1, %s, %s)",
+            [(rng.randint(1, posts), text(), start + timedelta(seconds=i))
+             for i in range(comments)],
+        )
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=200000)
+    parser.add_argument("--comments", type=int, default=200000)
+    parser.add_argument("--words", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, "bench.sqlite3"))
+        from django.core.management import call_command
+        from posts.search import LikeSearchBackend, SqliteFTSBackend
+
+        call_command("migrate", verbosity=0)
+        words = vocabulary(args.words, rng)
+        print(f"Наполнение: {args.posts} постов, "
+              f"{args.comments} комментариев...")
+        seed(args.posts, args.comments, words, rng)
+
+        fts = SqliteFTSBackend()
+        started = time.perf_counter()
+        documents = fts.rebuild()
+        print(f"Индексация {documents} документов: "
+              f"{time.perf_counter() - started:.1f} s")
+
+        like = LikeSearchBackend()
+        queries = ([rng.choice(words[:50]) for _ in range(args.queries // 2)]
+                   + [rng.choice(words[1000:]) for _ in range(args.queries
+                                                               // 2)])
+        print(f"\n{'запрос':16} {'FTS5, ms':>10} {'LIKE, ms':>10}")
+        fts_total = like_total = 0
+        for query in queries:
+            fts_ms = timed(lambda: fts.search(query), args.repeat)
+            like_ms = timed(lambda: like.search(query), args.repeat)
+            fts_total += fts_ms
+            like_total += like_ms
+            print(f"{query:16} {fts_ms:10.2f} {like_ms:10.2f}")
+        print(f"{'среднее':16} {fts_total / len(queries):10.2f} "
+              f"{like_total / len(queries):10.2f}")
+
+
+if __name__ == "__main__":
+    main()
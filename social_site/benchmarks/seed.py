@@ -0,0 +1,211 @@
+"""Детерминированное наполнение базы для нагрузочных тестов.
+
+Запуск из каталога ``social_site``::
+
+    python -m benchmarks.seed /tmp/bench/db.sqlite3 --scale small
+
+При одном и том же ``--seed`` получаются одинаковые данные: пользователи,
+группы, посты (часть с картинками, варианты которых уже построены),
+комментарии и граф подписок со степенным распределением подписчиков —
+несколько авторов собирают большую часть подписок. Производные данные
+(счётчики, ленты, поисковый индекс) пересобираются командами
+управления. Рядом с базой кладутся каталог ``media`` и манифест
+``<база>.json`` с выборкой адресов для драйвера нагрузки.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from io import BytesIO, StringIO
+
+SCALES = {
+    "tiny": {"users": 50, "groups": 5, "posts": 500, "comments": 1000,
+             "following": 5, "images": 2},
+    "small": {"users": 1000, "groups": 20, "posts": 20000,
+              "comments": 50000, "following": 20, "images": 8},
+    "medium": {"users": 10000, "groups": 100, "posts": 200000,
+               "comments": 500000, "following": 30, "images": 16},
+    "large": {"users": 100000, "groups": 500, "posts": 2000000,
+              "comments": 5000000, "following": 40, "images": 32},
+}
+PASSWORD = "bench"
+IMAGE_SHARE = 0.2
+# Показатель степенного закона популярности авторов.
+ALPHA = 1.2
+BATCH_SIZE = 10000
+WORDS = ("кот", "море", "город", "утро", "код", "чай", "книга", "лес",
+         "поезд", "музыка", "дождь", "сад", "гора", "река", "друг", "зима")
+
+
+def manifest_path(db_path):
+    return f"{db_path}.json"
+
+
+def setup(db_path):
+    """Настраивает Django на базу ``db_path`` и медиа рядом с ней."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_site.settings")
+    from django.conf import settings
+    settings.DATABASES["default"]["NAME"] = db_path
+    settings.MEDIA_ROOT = os.path.join(os.path.dirname(db_path), "media")
+    # Замеры без debug_toolbar и накопления connection.queries.
+    settings.DEBUG = False
+    import django
+    django.setup()
+
+
+def _text(rng, low, high):
+    return " ".join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def _images(count, rng):
+    """Сохраняет картинки и строит их варианты, возвращает имена."""
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import default_storage
+    from PIL import Image
+    from posts import thumbnails
+
+    names = []
+    for i in range(count):
+        name = f"posts/bench-{i}.jpg"
+        color = tuple(rng.randrange(256) for _ in range(3))
+        if not default_storage.exists(name):
+            buffer = BytesIO()
+            Image.new("RGB", (1280, 720), color).save(buffer, "JPEG")
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+        thumbnails.build_variants(name)
+        names.append(name)
+    return names
+
+
+def _executemany(cursor, sql, rows):
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, BATCH_SIZE))
+        if not batch:
+            return
+        cursor.executemany(sql, batch)
+
+
+def seed(users, groups, posts, comments, following, images, rng):
+    """Наполняет пустую базу сырыми INSERT и возвращает манифест."""
+    from django.contrib.auth.hashers import make_password
+    from django.core.management import call_command
+    from django.db import connection, transaction
+
+    start = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    password = make_password(PASSWORD)
+    image_names = _images(images, rng)
+    weights = list(itertools.accumulate(
+        1 / rank ** ALPHA for rank in range(1, users + 1)
+    ))
+    authors = {}
+
+    def post_rows():
+        for i in range(1, posts + 1):
+            author_id = rng.randint(1, users)
+            authors[i] = author_id
+            image = ""
+            if image_names and rng.random() < IMAGE_SHARE:
+                image = rng.choice(image_names)
+            yield (i, _text(rng, 5, 60), start + timedelta(seconds=i * 30),
+                   start + timedelta(seconds=i * 30), author_id,
+                   rng.randint(1, groups) if rng.random() < 0.7 else None,
+                   image, image)
+
+    def follow_rows():
+        for user_id in range(1, users + 1):
+            count = min(users - 1, int(rng.expovariate(1 / following)) + 1)
+            # Популярность автора падает со степенью его ранга.
+            targets = set(rng.choices(range(1, users + 1),
+                                      cum_weights=weights, k=count))
+            targets.discard(user_id)
+            for author_id in sorted(targets):
+                yield user_id, author_id
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        _executemany(
+            cursor,
+            "INSERT INTO auth_user (id, password, is_superuser, username, "
+            "first_name, last_name, email, is_staff, is_active, date_joined) "
+            "VALUES (%s, %s, 0, %s, '', '', '', 0, 1, %s)",
+            ((i, password, f"user{i}", start) for i in range(1, users + 1)),
+        )
+        _executemany(
+            cursor,
+            "INSERT INTO posts_group (id, title, slug, description) "
+            "VALUES (%s, %s, %s, '')",
+            ((i, f"Группа {i}", f"group-{i}") for i in range(1, groups + 1)),
+        )
+        _executemany(
+            cursor,
+            "INSERT INTO posts_post (id, text, pub_date, updated, author_id, "
+            "group_id, image, image_variants, comment_count, views) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 0, 0)",
+            post_rows(),
+        )
+        _executemany(
+            cursor,
+            "INSERT INTO posts_comment (post_id, author_id, text, created) "
+            "VALUES (%s, %s, %s, %s)",
+            ((rng.randint(1, posts), rng.randint(1, users),
+              _text(rng, 2, 20), start + timedelta(seconds=i))
+             for i in range(comments)),
+        )
+        _executemany(
+            cursor,
+            "INSERT INTO posts_follow (user_id, author_id) VALUES (%s, %s)",
+            follow_rows(),
+        )
+    for command in ("reconcile_counters", "rebuild_feed",
+                    "rebuild_search_index"):
+        call_command(command, stdout=StringIO())
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+    sample = sorted(rng.sample(range(1, posts + 1), min(posts, 1000)))
+    return {
+        "counts": {"users": users, "groups": groups, "posts": posts,
+                   "comments": comments, "following": following,
+                   "images": images},
+        "password": PASSWORD,
+        "users": [f"user{i}" for i in range(1, users + 1)][:1000],
+        "groups": [f"group-{i}" for i in range(1, groups + 1)][:1000],
+        "posts": [[f"user{authors[i]}", i] for i in sample],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db", help="путь к новой базе SQLite")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    for name in SCALES["tiny"]:
+        parser.add_argument(f"--{name}", type=int,
+                            help="переопределяет значение масштаба")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db)
+    if os.path.exists(db_path):
+        parser.error(f"{db_path} уже существует")
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    counts = {name: getattr(args, name) or value
+              for name, value in SCALES[args.scale].items()}
+
+    setup(db_path)
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+    started = time.perf_counter()
+    manifest = seed(rng=random.Random(args.seed), **counts)
+    manifest.update(scale=args.scale, seed=args.seed)
+    with open(manifest_path(db_path), "w") as output:
+        json.dump(manifest, output, ensure_ascii=False)
+    print(f"Наполнено за {time.perf_counter() - started:.1f} s: "
+          + ", ".join(f"{name}={value}" for name, value in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
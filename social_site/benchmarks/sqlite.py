@@ -0,0 +1,148 @@
+"""Чтение лент во время записи комментариев: PRAGMA SQLite по умолчанию
+против настроек из ``settings.SQLITE_PRAGMAS``.
+
+Запуск из каталога ``social_site`` против базы из ``benchmarks.seed``::
+
+    python -m benchmarks.sqlite /tmp/bench/db.sqlite3 --readers 4 \\
+        --writers 2 --duration 20
+
+Для каждого профиля берётся копия базы. ``--readers`` процессов читают
+ленты и посты (кэш страниц выключен), ``--writers`` процессов в это время
+пишут комментарии через ``add_comment``. Профиль ``default`` — журнал
+DELETE, PRAGMA по умолчанию и новое соединение на каждый запрос;
+``tuned`` — WAL, PRAGMA из настроек и ``CONN_MAX_AGE``.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import time
+
+from .load import Client, WSGITransport, drive, git_commit, summarize
+from .seed import setup
+
+READ_SCENARIOS = ["index", "group_posts", "profile", "post_view"]
+PROFILES = ("default", "tuned")
+
+
+def configure(profile):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_site.settings")
+    from django.conf import settings
+
+    database = settings.DATABASES["default"]
+    if profile == "default":
+        database["OPTIONS"] = {**database["OPTIONS"], "pragmas": {}}
+        database["CONN_MAX_AGE"] = 0
+    settings.PAGE_CACHE_TIMEOUT = 0
+
+
+def worker(index, role, profile, db_path, manifest, options, barrier,
+           results):
+    configure(profile)
+    setup(db_path)
+    rng = random.Random(options["seed"] + index)
+    transport = WSGITransport()
+    anonymous, authenticated = Client(transport), Client(transport)
+    if role == "writer":
+        authenticated.login(manifest["users"][index % len(manifest["users"])],
+                            manifest["password"])
+    scenarios = ["add_comment"] if role == "writer" else READ_SCENARIOS
+    barrier.wait()
+    samples = drive(anonymous, authenticated, manifest, scenarios, rng,
+                    deadline=time.perf_counter() + options["duration"])
+    results.put((role, samples))
+
+
+def copy_database(db_path, profile):
+    copy = f"{db_path}.{profile}"
+    source, target = sqlite3.connect(db_path), sqlite3.connect(copy)
+    try:
+        source.backup(target)
+        mode = "DELETE" if profile == "default" else "WAL"
+        target.execute(f"PRAGMA journal_mode = {mode}")
+    finally:
+        source.close()
+        target.close()
+    return copy
+
+
+def remove_database(path):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def run_profile(profile, db_path, manifest, options):
+    copy = copy_database(db_path, profile)
+    roles = (["reader"] * options["readers"]
+             + ["writer"] * options["writers"])
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(len(roles) + 1)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker,
+                        args=(i, role, profile, copy, manifest, options,
+                              barrier, results))
+        for i, role in enumerate(roles)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        barrier.wait()
+        started = time.perf_counter()
+        samples = {"reader": [], "writer": []}
+        for _ in processes:
+            role, role_samples = results.get()
+            samples[role].extend(role_samples)
+        elapsed = time.perf_counter() - started
+        for process in processes:
+            process.join()
+    finally:
+        remove_database(copy)
+    return {role: summarize(role_samples, elapsed)
+            for role, role_samples in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db", help="база SQLite из benchmarks.seed")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db)
+    with open(f"{db_path}.json") as source:
+        manifest = json.load(source)
+    options = {"readers": args.readers, "writers": args.writers,
+               "duration": args.duration, "seed": args.seed}
+    profiles = {}
+    for profile in args.profiles.split(","):
+        if profile not in PROFILES:
+            parser.error(f"неизвестный профиль {profile}")
+        profiles[profile] = run_profile(profile, db_path, manifest, options)
+
+    print(f"{'профиль':10} {'роль':8} {'запросов':>8} {'ошибок':>7} "
+          f"{'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for profile, roles in profiles.items():
+        for role, stats in roles.items():
+            if not stats["requests"]:
+                continue
+            print(f"{profile:10} {role:8} {stats['requests']:8} "
+                  f"{stats['errors']:7} {stats['rps']:8.2f} "
+                  f"{stats['p50_ms']:8.2f} {stats['p95_ms']:8.2f} "
+                  f"{stats['p99_ms']:8.2f}")
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"commit": git_commit(), "options": options,
+                       "profiles": profiles},
+                      output, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
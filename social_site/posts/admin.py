@@ -1,12 +1,100 @@
-from django.contrib import admin
+"""Админка постов, рассчитанная на большие таблицы.
+
+Колонки авторов, групп и постов читаются одним запросом
+(``list_select_related``), полный ``COUNT(*)`` не выполняется: без
+фильтров число строк берётся из статистики ``ANALYZE`` (``sqlite_stat1``)
+или из максимального ``id``, а с фильтрами считается не дальше
+``COUNT_LIMIT`` строк. Поиск идёт через индекс ``posts.search`` вместо
+``LIKE`` по тем же полям, что ``search_fields``, и возвращает не больше
+``SEARCH_LIMIT`` лучших совпадений; если их больше, список предупреждает
+об этом.
+"""
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+from . import search
 from .models import Post, Group, Comment
 
 
-class PostAdmin(admin.ModelAdmin):
+COUNT_LIMIT = 10000
+# Id совпадений уходят в IN (...), SQLite ограничивает число параметров.
+SEARCH_LIMIT = 500
+
+
+def table_rows(model, using):
+    """Число строк таблицы по статистике ``ANALYZE`` или ``None``."""
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1",
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+    except DatabaseError:
+        # ANALYZE ещё не выполнялся, таблицы статистики нет.
+        return None
+    return int(row[0].split()[0]) if row else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор с оценкой числа строк вместо ``COUNT(*)``."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list.order_by()
+        if queryset.query.where:
+            return queryset[:COUNT_LIMIT].count()
+        rows = table_rows(queryset.model, queryset.db)
+        if rows is None:
+            rows = queryset.aggregate(rows=Max("pk"))["rows"] or 0
+        return rows
+
+
+class IndexedSearchMixin:
+    """Поиск в списке и в автодополнении через ``posts.search``."""
+
+    def search_ids(self, search_term):
+        raise NotImplementedError
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        ids = self.search_ids(search_term)
+        match = request.resolver_match
+        # Автодополнение тоже ищет здесь, но сообщение показал бы только
+        # следующий открытый список.
+        if (len(ids) >= SEARCH_LIMIT and match
+                and match.url_name.endswith("_changelist")):
+            messages.warning(
+                request,
+                f"Показаны только {SEARCH_LIMIT} лучших совпадений, "
+                f"уточните запрос.",
+            )
+        return queryset.filter(pk__in=ids), False
+
+
+class ScaledAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = "-пусто-"
+
+
+class PostAdmin(ScaledAdmin):
     list_display = ("pk", "text", "pub_date", "author", "group")
+    list_select_related = ("author", "group")
     search_fields = ("text",)
     list_filter = ("pub_date",)
-    empty_value_display = "-пусто-"
+    autocomplete_fields = ("author", "group")
+
+    def search_ids(self, search_term):
+        return search.get_backend().search_texts(search_term,
+                                                 limit=SEARCH_LIMIT)
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -15,8 +103,19 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = "-пусто-"
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ScaledAdmin):
     list_display = ("pk", "text", "author", "post", "created")
+    list_select_related = ("author", "post")
+    search_fields = ("text",)
+    autocomplete_fields = ("author",)
+    # Постов слишком много для выпадающего списка и автодополнения.
+    raw_id_fields = ("post",)
+    # Порядок по первичному ключу не требует сортировки всей таблицы.
+    ordering = ("-pk",)
+
+    def search_ids(self, search_term):
+        return search.get_backend().search_comments(search_term,
+                                                    limit=SEARCH_LIMIT)
 
 
 admin.site.register(Comment, CommentAdmin)
@@ -0,0 +1,171 @@
+"""Асинхронные версии вьюх лент только для чтения.
+
+Включаются для отдельных маршрутов настройкой ``ASYNC_VIEWS`` и имеют
+смысл под ASGI: пока запрос ждёт БД или медленного клиента, поток не
+занят. Независимые запросы (автор, счётчики и страница постов профиля)
+выполняются параллельно через ``threads.gather``; шаблон рендерится в
+пуле потоков по уже загруженным данным.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import get_object_or_404, render
+
+from . import (feed, follow_graph, recommendations, threads, trending,
+               view_counts)
+from .forms import CommentForm
+from .models import Comment, Group, Post, User, UserStats
+from .page_cache import (author_scope, cached_page, group_scope, post_scope,
+                         POSTS, TRENDING_GROUPS)
+from .pagination import comment_page, paginate, partial_requested
+from .replicas import replica_reads
+
+
+def _page(request, object_list):
+    """``paginate`` с уже загруженной страницей."""
+    paginator, page = paginate(request, object_list)
+    page.object_list = list(page.object_list)
+    return paginator, page
+
+
+def _stats(username):
+    stats = UserStats.objects.filter(user__username=username).first()
+    return stats or UserStats()
+
+
+def _followees(request):
+    if not request.user.is_authenticated:
+        return None
+    return follow_graph.followees(request.user.id)
+
+
+def _who_to_follow(request):
+    return recommendations.for_user(request.user)
+
+
+async def _render(request, template_name, context, status=None):
+    return await threads.run(render, request, template_name, context,
+                             status=status)
+
+
+@replica_reads
+@cached_page(lambda: [POSTS])
+async def index(request):
+    paginator, page = await threads.run(_page, request, Post.objects.feed())
+    if partial_requested(request):
+        return await _render(request, "feed_items.html", {"page": page})
+    return await _render(request,
+                         "index.html",
+                         {"page": page, "paginator": paginator})
+
+
+@replica_reads
+@cached_page(lambda slug: [group_scope(slug), TRENDING_GROUPS])
+async def group_posts(request, slug):
+    group, (paginator, page), trending_groups = await threads.gather(
+        partial(get_object_or_404, Group, slug=slug),
+        partial(_page, request, Post.objects.feed().filter(group__slug=slug)),
+        trending.top_groups,
+    )
+    if partial_requested(request):
+        return await _render(request, "feed_items.html", {"page": page})
+    return await _render(request,
+                         "group.html",
+                         {"group": group,
+                          "page": page,
+                          "paginator": paginator,
+                          "trending_groups": trending_groups})
+
+
+@replica_reads
+@cached_page(lambda username: [author_scope(username)], personal=True)
+async def profile(request, username):
+    post_list = Post.objects.feed().filter(author__username=username)
+    (author, stats, (paginator, page), followees,
+     who_to_follow) = await threads.gather(
+        partial(get_object_or_404, User, username=username),
+        partial(_stats, username),
+        partial(_page, request, post_list),
+        partial(_followees, request),
+        partial(_who_to_follow, request),
+    )
+    if partial_requested(request):
+        return await _render(request, "feed_items.html", {"page": page})
+    is_following = (followees is not None
+                    and follow_graph.contains(followees, author.id))
+    return await _render(request,
+                         "profile.html",
+                         {"author": author,
+                          "is_following": is_following,
+                          "who_to_follow": who_to_follow,
+                          "page": page,
+                          "post_list": post_list,
+                          "paginator": paginator,
+                          "posts_count": stats.posts_count,
+                          "followers": stats.followers_count,
+                          "following": stats.following_count})
+
+
+@view_counts.count_views
+@replica_reads
+@cached_page(lambda username, post_id: [author_scope(username),
+                                         post_scope(post_id)])
+async def post_view(request, username, post_id):
+    post, stats, items = await threads.gather(
+        partial(get_object_or_404, Post.objects.select_related("author"),
+                id=post_id, author__username=username),
+        partial(_stats, username),
+        partial(comment_page, Comment.objects.filter(
+            post_id=post_id, post__author__username=username
+        ), request.GET.get("after")),
+    )
+    return await _render(request,
+                         "post.html",
+                         {"author": post.author,
+                          "post": post,
+                          "form": CommentForm(instance=None),
+                          "comments": items.object_list,
+                          "items": items,
+                          "count_post": stats.posts_count,
+                          "followers": stats.followers_count,
+                          "following": stats.following_count})
+
+
+@replica_reads
+@cached_page(lambda username, post_id: [author_scope(username),
+                                         post_scope(post_id)])
+async def comments(request, username, post_id):
+    post, items = await threads.gather(
+        partial(get_object_or_404, Post.objects.select_related("author"),
+                id=post_id, author__username=username),
+        partial(comment_page, Comment.objects.filter(
+            post_id=post_id, post__author__username=username
+        ), request.GET.get("after")),
+    )
+    return await _render(request,
+                         "comment_list.html",
+                         {"post": post, "comments": items.object_list,
+                          "items": items})
+
+
+def _follow_page(request):
+    if not request.user.is_authenticated:
+        return None
+    return _page(request, feed.follow_feed(request.user))
+
+
+@replica_reads
+async def follow_index(request):
+    result = await threads.run(_follow_page, request)
+    if result is None:
+        return redirect_to_login(request.get_full_path(), settings.LOGIN_URL)
+    paginator, page = result
+    if partial_requested(request):
+        return await _render(request, "feed_items.html", {"page": page})
+    who_to_follow = await threads.run(_who_to_follow, request)
+    return await _render(request,
+                         "follow.html",
+                         {"page": page,
+                          "paginator": paginator,
+                          "who_to_follow": who_to_follow})
@@ -0,0 +1,92 @@
+"""Денормализованные счётчики.
+
+``Post.comment_count`` и ``UserStats`` обновляются атомарно через ``F()``
+из сигналов сохранения и удаления ``Post``, ``Comment`` и ``Follow``.
+Расхождения исправляет команда ``reconcile_counters``.
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def bump_user(user_id, **deltas):
+    changes = {
+        field: Greatest(F(field) + delta, 0) if delta < 0
+        else F(field) + delta
+        for field, delta in deltas.items()
+    }
+    if UserStats.objects.filter(user=user_id).update(**changes):
+        return
+    # Строки нет: при каскадном удалении пользователя её уже удалили, и
+    # уменьшение не должно создавать её заново.
+    if all(delta < 0 for delta in deltas.values()):
+        return
+    if User.objects.filter(pk=user_id).exists():
+        UserStats.objects.get_or_create(
+            user_id=user_id,
+            defaults={field: max(delta, 0) for field, delta in deltas.items()},
+        )
+
+
+def bump_comments(post_id, delta):
+    count = F("comment_count") + delta
+    Post.objects.filter(id=post_id).update(
+        comment_count=Greatest(count, 0) if delta < 0 else count
+    )
+
+
+def user_stats(user):
+    """Счётчики пользователя без записи в БД, если строки ещё нет."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return UserStats(user=user)
+
+
+def _count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        Value(0),
+    )
+
+
+def reconcile():
+    """Пересчитывает все счётчики, возвращает число исправленных строк."""
+    comment_count = _count(Comment.objects.all(), "post")
+    drifted_posts = Post.objects.annotate(
+        real=comment_count
+    ).exclude(comment_count=F("real")).values("pk")
+    fixed = Post.objects.filter(pk__in=drifted_posts).update(
+        comment_count=comment_count
+    )
+
+    missing = User.objects.filter(stats__isnull=True).values_list("pk",
+                                                                  flat=True)
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id) for user_id in missing.iterator()],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    counts = {
+        "posts_count": _count(Post.objects.all(), "author"),
+        "followers_count": _count(Follow.objects.all(), "author"),
+        "following_count": _count(Follow.objects.all(), "user"),
+    }
+    drifted_users = UserStats.objects.annotate(**{
+        f"real_{field}": real for field, real in counts.items()
+    }).exclude(
+        posts_count=F("real_posts_count"),
+        followers_count=F("real_followers_count"),
+        following_count=F("real_following_count"),
+    ).values("pk")
+    fixed += UserStats.objects.filter(pk__in=drifted_users).update(
+        **counts
+    )
+    return fixed
@@ -0,0 +1,163 @@
+"""Материализованная лента подписок (fan-out-on-write).
+
+При публикации пост раскладывается в ``FeedItem`` каждого подписчика
+автора, поэтому ``/follow/`` читает одну индексированную выборку по
+``(user, pub_date)``. Когда подписчиков у автора становится больше
+``FEED_FANOUT_MAX_FOLLOWERS``, он помечается ``UserStats.feed_pull``:
+раскладка прекращается, его посты подмешиваются при чтении.
+
+Обратно автор переходит, только опустившись до
+``FEED_FANOUT_MIN_FOLLOWERS``, и не в запросе отписки: посты,
+опубликованные за время чтения, нужно разложить всем подписчикам, это
+делает ``backfill_authors`` (``rebuild_feed --backfill``). Пока она не
+выполнена, автор остаётся в режиме чтения и ленты верны, только
+медленнее. Разрыв между порогами не даёт автору у порога переключаться
+туда и обратно на каждой подписке.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import FeedItem, Follow, Post, UserStats
+
+
+BATCH_SIZE = 500
+
+
+def fanout_limit():
+    return getattr(settings, "FEED_FANOUT_MAX_FOLLOWERS", 1000)
+
+
+def fanout_min():
+    limit = fanout_limit()
+    return min(getattr(settings, "FEED_FANOUT_MIN_FOLLOWERS",
+                       limit * 4 // 5), limit)
+
+
+def is_fanout_author(author_id):
+    return not UserStats.objects.filter(user=author_id,
+                                        feed_pull=True).exists()
+
+
+def pull_author_ids(user):
+    """Авторы из подписок ``user``, чьи посты читаются без раскладки."""
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__stats__feed_pull=True,
+        ).values_list("author_id", flat=True)
+    )
+
+
+def fan_out_post(post):
+    if not is_fanout_author(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author=post.author_id
+    ).values_list("user_id", flat=True)
+    FeedItem.objects.bulk_create(
+        [FeedItem(user_id=user_id,
+                  post_id=post.id,
+                  author_id=post.author_id,
+                  pub_date=post.pub_date)
+         for user_id in follower_ids.iterator()],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def add_author(user_id, author_id):
+    """Добавляет в ленту ``user_id`` все посты ``author_id``.
+
+    Вызывается после увеличения счётчика подписчиков; автор, перешедший
+    ``FEED_FANOUT_MAX_FOLLOWERS``, переводится в режим чтения.
+    """
+    stats = UserStats.objects.filter(user=author_id).values_list(
+        "followers_count", "feed_pull"
+    ).first()
+    followers, pull = stats or (0, False)
+    if pull:
+        return
+    if followers > fanout_limit():
+        UserStats.objects.filter(user=author_id).update(feed_pull=True)
+        return
+    _push_author_posts(user_id, author_id)
+
+
+def _push_posts(user_ids, author_id, posts):
+    batch = []
+    for user_id in user_ids:
+        for post_id, pub_date in posts:
+            batch.append(FeedItem(user_id=user_id,
+                                  post_id=post_id,
+                                  author_id=author_id,
+                                  pub_date=pub_date))
+            if len(batch) >= BATCH_SIZE:
+                FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+    FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def _author_posts(author_id):
+    return Post.objects.filter(author=author_id).values_list("id",
+                                                              "pub_date")
+
+
+def _push_author_posts(user_id, author_id):
+    _push_posts([user_id], author_id, _author_posts(author_id).iterator())
+
+
+def backfill_authors():
+    """Возвращает к раскладке авторов, опустившихся до
+    ``FEED_FANOUT_MIN_FOLLOWERS``, и раскладывает их посты подписчикам.
+
+    Флаг снимается в той же транзакции до раскладки, поэтому посты и
+    подписки, появившиеся во время неё, раскладываются сигналами.
+    """
+    author_ids = UserStats.objects.filter(
+        feed_pull=True, followers_count__lte=fanout_min()
+    ).values_list("user_id", flat=True)
+    done = 0
+    for author_id in list(author_ids):
+        with transaction.atomic():
+            if not UserStats.objects.filter(
+                user=author_id, feed_pull=True
+            ).update(feed_pull=False):
+                continue
+            posts = list(_author_posts(author_id))
+            follower_ids = Follow.objects.filter(
+                author=author_id
+            ).values_list("user_id", flat=True)
+            _push_posts(follower_ids.iterator(), author_id, posts)
+        done += 1
+    return done
+
+
+def remove_author(user_id, author_id):
+    FeedItem.objects.filter(user=user_id, author=author_id).delete()
+
+
+def follow_feed(user):
+    """Посты авторов, на которых подписан ``user``, новые сверху."""
+    pull_ids = pull_author_ids(user)
+    if not pull_ids:
+        return Post.objects.feed().filter(
+            feed_items__user=user
+        ).order_by("-feed_items__pub_date")
+    pushed = FeedItem.objects.filter(user=user).values("post_id")
+    return Post.objects.feed().filter(
+        Q(id__in=pushed) | Q(author__in=pull_ids)
+    )
+
+
+def rebuild():
+    """Пересобирает ленты всех пользователей по таблице ``Follow``."""
+    FeedItem.objects.all().delete()
+    stats = UserStats.objects.all()
+    stats.filter(followers_count__gt=fanout_limit()).update(feed_pull=True)
+    stats.filter(followers_count__lte=fanout_limit()).update(feed_pull=False)
+    edges = Follow.objects.exclude(author__stats__feed_pull=True)
+    for user_id, author_id in edges.values_list("user_id",
+                                                "author_id").iterator():
+        _push_author_posts(user_id, author_id)
+    return FeedItem.objects.count()
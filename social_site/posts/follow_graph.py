@@ -0,0 +1,161 @@
+"""Граф подписок в кэше.
+
+Для каждого пользователя в кэше лежат два отсортированных массива id
+(``array("I")`` в байтах): на кого он подписан и кто подписан на него.
+«A подписан на B» — двоичный поиск по массиву A, число подписок — длина
+массива, подписки на авторов целой страницы — один массив и поиск по нему
+для каждого автора (``followed_among``).
+
+Массив, которого нет в кэше, строится одним запросом по индексу
+``Follow``. Сигналы ``Follow`` после коммита правят закэшированные
+массивы на месте (``add``/``remove``). Правка и построение массива
+выполняются под блокировкой ключа в кэше (``cache.add``), поэтому две
+подписки не теряют одна другую, а массив, прочитанный из базы до
+подписки, не ложится в кэш после её правки. Читатель, не получивший
+блокировку, берёт массив из базы без записи в кэш. Если правка не
+дождалась блокировки за ``LOCK_WAIT`` секунд, массив удаляется из кэша.
+"""
+import bisect
+import logging
+import time
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow
+
+
+FOLLOWEES = "followees"
+FOLLOWERS = "followers"
+# id из AutoField помещаются в 32 бита: 4 байта на подписку.
+TYPECODE = "I"
+# Блокировка истекает сама, если процесс упал, не сняв её.
+LOCK_TIMEOUT = 5
+LOCK_WAIT = 1
+
+logger = logging.getLogger(__name__)
+
+
+def timeout():
+    return getattr(settings, "FOLLOW_GRAPH_TIMEOUT", 60 * 60)
+
+
+def _key(kind, user_id):
+    return f"follow:{kind}:{user_id}"
+
+
+def _lock_key(key):
+    return f"{key}:lock"
+
+
+def _unpack(data):
+    ids = array(TYPECODE)
+    ids.frombytes(data)
+    return ids
+
+
+def _load(kind, user_id):
+    if kind == FOLLOWEES:
+        ids = Follow.objects.filter(user=user_id).values_list("author_id",
+                                                              flat=True)
+    else:
+        ids = Follow.objects.filter(author=user_id).values_list("user_id",
+                                                                flat=True)
+    return array(TYPECODE, sorted(ids))
+
+
+def _get(kind, user_id):
+    key = _key(kind, user_id)
+    data = cache.get(key)
+    if data is not None:
+        return _unpack(data)
+    if not cache.add(_lock_key(key), 1, LOCK_TIMEOUT):
+        # Массив правят или строят: читаем базу, кэш не трогаем.
+        return _load(kind, user_id)
+    try:
+        ids = _load(kind, user_id)
+        cache.set(key, ids.tobytes(), timeout())
+    finally:
+        cache.delete(_lock_key(key))
+    return ids
+
+
+def contains(ids, value):
+    index = bisect.bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def followees(user_id):
+    """Отсортированные id авторов, на которых подписан ``user_id``."""
+    return _get(FOLLOWEES, user_id)
+
+
+def follows(user_id, author_id):
+    return contains(followees(user_id), author_id)
+
+
+def following_count(user_id):
+    return len(followees(user_id))
+
+
+def followers_count(user_id):
+    return len(_get(FOLLOWERS, user_id))
+
+
+def followed_among(user_id, author_ids):
+    """Те из ``author_ids``, на кого подписан ``user_id``."""
+    ids = followees(user_id)
+    return {author_id for author_id in author_ids
+            if contains(ids, author_id)}
+
+
+def _acquire(lock):
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(lock, 1, LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def _update(kind, user_id, value, insert):
+    key = _key(kind, user_id)
+    lock = _lock_key(key)
+    if not _acquire(lock):
+        logger.warning("Блокировка %s не получена, массив сброшен", key)
+        cache.delete(key)
+        return
+    try:
+        data = cache.get(key)
+        if data is None:
+            # Массив построится из базы при первом чтении.
+            return
+        ids = _unpack(data)
+        index = bisect.bisect_left(ids, value)
+        present = index < len(ids) and ids[index] == value
+        if insert and not present:
+            ids.insert(index, value)
+        elif not insert and present:
+            del ids[index]
+        else:
+            return
+        cache.set(key, ids.tobytes(), timeout())
+    finally:
+        cache.delete(lock)
+
+
+def _apply(user_id, author_id, insert):
+    _update(FOLLOWEES, user_id, author_id, insert)
+    _update(FOLLOWERS, author_id, user_id, insert)
+
+
+def add(user_id, author_id):
+    """Добавляет подписку в массивы после коммита транзакции."""
+    transaction.on_commit(lambda: _apply(user_id, author_id, True))
+
+
+def remove(user_id, author_id):
+    """Убирает подписку из массивов после коммита транзакции."""
+    transaction.on_commit(lambda: _apply(user_id, author_id, False))
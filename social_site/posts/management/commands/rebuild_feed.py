@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import feed
+
+
+class Command(BaseCommand):
+    help = "Пересобирает материализованные ленты подписок с нуля"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backfill",
+            action="store_true",
+            help="Только разложить посты авторов, опустившихся до "
+                 "FEED_FANOUT_MIN_FOLLOWERS подписчиков",
+        )
+
+    def handle(self, *args, **options):
+        if options["backfill"]:
+            authors = feed.backfill_authors()
+            self.stdout.write(self.style.SUCCESS(
+                f"Возвращено к раскладке авторов: {authors}"
+            ))
+            return
+        with transaction.atomic():
+            total = feed.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Лента пересобрана: {total} записей"
+        ))
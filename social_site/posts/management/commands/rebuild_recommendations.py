@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает рекомендации «на кого подписаться»"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top-k", type=int,
+                            help="сколько авторов хранить для пользователя")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = recommendations.rebuild(options["top_k"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Рекомендации пересчитаны для {total} пользователей "
+            f"за {time.perf_counter() - started:.1f} с"
+        ))
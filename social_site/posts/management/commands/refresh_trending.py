@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+from posts.models import TrendingScore
+
+
+class Command(BaseCommand):
+    help = "Удаляет затухшие оценки и обновляет списки популярного"
+
+    def handle(self, *args, **options):
+        pruned = trending.prune()
+        for kind, _ in TrendingScore.KINDS:
+            trending.refresh(kind)
+        self.stdout.write(self.style.SUCCESS(
+            f"Списки популярного обновлены, удалено оценок: {pruned}"
+        ))
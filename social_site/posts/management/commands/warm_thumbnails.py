@@ -0,0 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import F
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def warm(name):
+    try:
+        return thumbnails.generate(name)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Строит недостающие варианты картинок постов параллельно"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+
+    def handle(self, *args, **options):
+        missing = list(
+            Post.objects.exclude(image="").exclude(image__isnull=True)
+            .exclude(image_variants=F("image"))
+            .order_by().values_list("image", flat=True).distinct()
+        )
+        self.stdout.write(f"Картинок к обработке: {len(missing)}")
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            built = sum(pool.map(warm, missing))
+        self.stdout.write(self.style.SUCCESS(
+            f"Обработано картинок: {built}, ошибок: {len(missing) - built}"
+        ))
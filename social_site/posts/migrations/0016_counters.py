@@ -0,0 +1,52 @@
+# Generated by Django 3.1.7 on 2026-10-18 12:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    Count = models.Count
+
+    comments = Post.objects.annotate(total=Count('comments')).filter(total__gt=0)
+    for post in comments.iterator():
+        Post.objects.filter(pk=post.pk).update(comment_count=post.total)
+
+    stats = {pk: UserStats(user_id=pk) for pk in User.objects.values_list('pk', flat=True)}
+    for row in Post.objects.values('author').annotate(total=Count('id')):
+        stats[row['author']].posts_count = row['total']
+    for row in Follow.objects.values('author').annotate(total=Count('id')):
+        stats[row['author']].followers_count = row['total']
+    for row in Follow.objects.values('user').annotate(total=Count('id')):
+        stats[row['user']].following_count = row['total']
+    UserStats.objects.bulk_create(stats.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0015_feeditem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+                ('followers_count', models.PositiveIntegerField(default=0)),
+                ('following_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
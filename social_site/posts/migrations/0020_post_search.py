@@ -0,0 +1,37 @@
+# Generated by Django 3.1.7 on 2026-10-18 13:20
+
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5("
+        "body, post_id UNINDEXED, tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO posts_search (rowid, body, post_id) "
+        "SELECT id * 2, COALESCE(text, ''), id FROM posts_post"
+    )
+    schema_editor.execute(
+        "INSERT INTO posts_search (rowid, body, post_id) "
+        "SELECT id * 2 + 1, COALESCE(text, ''), post_id FROM posts_comment "
+        "WHERE post_id IS NOT NULL"
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS posts_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.1.7 on 2026-10-18 13:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('posts', '0020_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recommendation',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recommendation', serialize=False, to='auth.user')),
+                ('authors', models.JSONField(default=list)),
+                ('computed', models.DateTimeField(auto_now=True, verbose_name='date computed')),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.1.7 on 2026-10-18 14:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_feed_pull(apps, schema_editor):
+    UserStats = apps.get_model('posts', 'UserStats')
+    limit = getattr(settings, 'FEED_FANOUT_MAX_FOLLOWERS', 1000)
+    UserStats.objects.filter(followers_count__gt=limit).update(feed_pull=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_post_views'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='feed_pull',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(fill_feed_pull, migrations.RunPython.noop),
+    ]
@@ -14,12 +14,37 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    FEED_FIELDS = (
+        "text", "pub_date", "updated", "image", "image_variants",
+        "comment_count", "views",
+        "author__username", "group__slug", "group__title",
+    )
+
+    def feed(self):
+        """Посты для лент: всё, что нужно ``post_item.html``, одним запросом."""
+        return self.select_related(
+            "author", "group"
+        ).only(*self.FEED_FIELDS).order_by("-pub_date")
+
+
 class Post(models.Model):
     class Meta:
         ordering = ["-pub_date"]
+        indexes = [
+            models.Index(fields=["-pub_date", "-id"],
+                         name="post_pub_date_idx"),
+            models.Index(fields=["author", "-pub_date"],
+                         name="post_author_pub_date_idx"),
+            models.Index(fields=["group", "-pub_date"],
+                         name="post_group_pub_date_idx"),
+        ]
+
+    objects = PostQuerySet.as_manager()
 
     text = models.TextField(null=True)
     pub_date = models.DateTimeField("date published", auto_now_add=True)
+    updated = models.DateTimeField("date updated", auto_now=True)
     author = models.ForeignKey(User,
                                on_delete=models.CASCADE,
                                related_name="posts")
@@ -29,6 +54,12 @@ class Post(models.Model):
                               blank=True,
                               null=True)
     image = models.ImageField(upload_to="posts/", blank=True, null=True)
+    # Имя картинки, для которой готовы адаптивные варианты
+    image_variants = models.CharField(max_length=100, blank=True,
+                                      editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Пишется пачками из posts.view_counts
+    views = models.PositiveIntegerField(default=0, editable=False)
 
 
 class Comment(models.Model):
@@ -45,6 +76,10 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["created"]
+        indexes = [
+            models.Index(fields=["post", "created"],
+                         name="comment_post_created_idx"),
+        ]
 
 
 class Follow(models.Model):
@@ -68,3 +103,82 @@ class Follow(models.Model):
                 name="user_not_author"
             )
         ]
+        indexes = [
+            models.Index(fields=["author", "user"],
+                         name="follow_author_user_idx"),
+        ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name="stats")
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    # Посты автора читаются при чтении ленты, а не раскладываются
+    # подписчикам (posts.feed).
+    feed_pull = models.BooleanField(default=False)
+
+
+class FeedItem(models.Model):
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name="feed_items")
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name="feed_items")
+    author = models.ForeignKey(User,
+                               on_delete=models.CASCADE,
+                               related_name="+")
+    pub_date = models.DateTimeField("date published")
+
+    class Meta:
+        ordering = ["-pub_date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"],
+                name="unique_feed_user_post"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-pub_date"],
+                         name="feed_user_pub_date_idx"),
+            models.Index(fields=["user", "author"],
+                         name="feed_user_author_idx"),
+        ]
+
+
+class Recommendation(models.Model):
+    """На кого подписаться: top-K из ``rebuild_recommendations``."""
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name="recommendation")
+    # [[id, username], ...] по убыванию оценки.
+    authors = models.JSONField(default=list)
+    computed = models.DateTimeField("date computed", auto_now=True)
+
+
+class TrendingScore(models.Model):
+    POST = "post"
+    GROUP = "group"
+    KINDS = [(POST, "post"), (GROUP, "group")]
+
+    kind = models.CharField(max_length=5, choices=KINDS)
+    object_id = models.PositiveIntegerField()
+    # ln затухающей суммы весов событий, см. posts.trending.
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "object_id"],
+                name="unique_trending_kind_object"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["kind", "-score"],
+                         name="trending_kind_score_idx"),
+        ]
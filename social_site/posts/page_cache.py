@@ -0,0 +1,268 @@
+"""Кэш страниц для анонимных пользователей со сбросом по событиям.
+
+Ключ страницы включает номера поколений (generation) областей, от которых
+она зависит. Сигналы ``Post``/``Comment``/``Follow`` увеличивают номера
+затронутых областей, и старые записи просто перестают читаться, поэтому
+страницы можно хранить часами без устаревших данных.
+
+Из тех же поколений ``conditional`` строит ETag страницы, не вызывая
+вьюху: повторный запрос с ``If-None-Match`` получает 304 и от анонимов,
+и от вошедших пользователей. Страницы с ``personal=True`` показывают
+вошедшему пользователю его рекомендации, поэтому их ETag зависит ещё от
+областей ``RECOMMENDATIONS`` и ``viewer_scope`` зрителя.
+"""
+import asyncio
+import hashlib
+import time
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from . import replicas, threads
+
+
+SITE = "site"
+POSTS = "posts"
+# Списки популярного сбрасываются раздельно: боковая панель сообществ
+# не должна пересобирать страницы групп при каждом сдвиге постов.
+TRENDING_POSTS = "trending:post"
+TRENDING_GROUPS = "trending:group"
+RECOMMENDATIONS = "recommendations"
+# Не область: имя номера отрезка времени в ключе страниц с ``lifetime``.
+PERIOD = "period"
+
+
+def group_scope(slug):
+    return f"group:{slug}"
+
+
+def author_scope(username):
+    return f"author:{username}"
+
+
+def post_scope(post_id):
+    return f"post:{post_id}"
+
+
+def viewer_scope(user_id):
+    return f"viewer:{user_id}"
+
+
+def _viewer_scopes(user_id):
+    return [RECOMMENDATIONS, viewer_scope(user_id)]
+
+
+def timeout():
+    return getattr(settings, "PAGE_CACHE_TIMEOUT", 60 * 60 * 6)
+
+
+def _generation_key(scope):
+    return f"gen:{scope}"
+
+
+def bump(*scopes):
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Начальное значение из часов: после вытеснения ключа номер
+            # не совпадёт ни с одним из уже использованных.
+            cache.set(key, time.time_ns(), None)
+
+
+def generations(scopes):
+    keys = [_generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def _is_authenticated(request):
+    return request.user.is_authenticated
+
+
+def _page_key(view, request, names, gens):
+    raw = "|".join(
+        [view.__name__, request.get_full_path()]
+        + [f"{name}={gen}" for name, gen in zip(names, gens)]
+    )
+    return "page:" + hashlib.md5(raw.encode()).hexdigest()
+
+
+def _store_timeout(lifetime=None):
+    # Страница с реплики могла не увидеть записи, которые уже сбросили
+    # поколения, поэтому хранится не дольше отставания реплики.
+    seconds = timeout()
+    if replicas.used():
+        seconds = min(seconds, replicas.pin_seconds())
+    if lifetime:
+        seconds = min(seconds, lifetime())
+    return seconds
+
+
+def _with_period(names, gens, lifetime):
+    # Номер отрезка длиной ``lifetime()`` секунд входит в ключ и ETag как
+    # ещё одно поколение: страница пересобирается не реже раза за отрезок,
+    # даже если её области никто не сбросил.
+    if not lifetime:
+        return names, gens
+    period = int(time.time() // max(lifetime(), 1))
+    return [*names, PERIOD], [*gens, period]
+
+
+def _cacheable(response):
+    return (response.status_code == 200 and not response.streaming
+            and not response.cookies)
+
+
+def cache_anonymous(scopes, lifetime=None):
+    """Кэширует ответ вьюхи для анонимных GET-запросов.
+
+    ``scopes`` получает аргументы URL и возвращает области, от которых
+    зависит страница; область ``SITE`` добавляется всегда. ``lifetime``
+    возвращает предельный срок жизни страницы в секундах — для страниц,
+    которые меняются без сброса областей. Подходит и для асинхронных
+    вьюх.
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            return _cache_anonymous_async(view, scopes, lifetime)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ("GET", "HEAD")
+                    or request.user.is_authenticated or not timeout()):
+                return view(request, *args, **kwargs)
+            names = [SITE, *scopes(**kwargs)]
+            names, gens = _with_period(names, generations(names), lifetime)
+            key = _page_key(view, request, names, gens)
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+            response = view(request, *args, **kwargs)
+            if _cacheable(response):
+                cache.set(key,
+                          (response.content, response["Content-Type"]),
+                          _store_timeout(lifetime))
+            return response
+        return wrapper
+    return decorator
+
+
+def _cache_anonymous_async(view, scopes, lifetime):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or not timeout():
+            return await view(request, *args, **kwargs)
+        names = [SITE, *scopes(**kwargs)]
+        # Сессия пользователя и поколения областей читаются параллельно.
+        authenticated, gens = await threads.gather(
+            partial(_is_authenticated, request), partial(generations, names)
+        )
+        if authenticated:
+            return await view(request, *args, **kwargs)
+        names, gens = _with_period(names, gens, lifetime)
+        key = _page_key(view, request, names, gens)
+        cached = await threads.run(cache.get, key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        response = await view(request, *args, **kwargs)
+        if _cacheable(response):
+            await threads.run(cache.set, key,
+                              (response.content, response["Content-Type"]),
+                              _store_timeout(lifetime))
+        return response
+    return wrapper
+
+
+def _etag(request, names, gens):
+    # Страница вошедшего пользователя содержит его имя и CSRF-токен
+    # формы, поэтому они входят в ETag наравне с поколениями.
+    user = request.user.pk if request.user.is_authenticated else ""
+    csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, "")
+    raw = "|".join([str(user), csrf]
+                   + [f"{name}={gen}" for name, gen in zip(names, gens)])
+    return '"%s"' % hashlib.md5(raw.encode()).hexdigest()
+
+
+def _set_etag(request, response, etag):
+    # Страница с реплики могла отстать от поколений: её ETag посчитает
+    # ConditionalGetMiddleware по содержимому.
+    if (response.status_code != 200 or response.has_header("ETag")
+            or replicas.used()):
+        return response
+    response["ETag"] = etag
+    if request.user.is_authenticated:
+        patch_cache_control(response, no_cache=True, private=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def conditional(scopes, personal=False, lifetime=None):
+    """Отвечает 304 на GET с ``If-None-Match``, если области не менялись.
+
+    ``scopes`` и ``lifetime`` — как у ``cache_anonymous``; ``personal`` —
+    страница вошедшего пользователя зависит от его подписок и
+    рекомендаций. Подходит и для асинхронных вьюх.
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            return _conditional_async(view, scopes, personal, lifetime)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            names = [SITE, *scopes(**kwargs)]
+            if personal and request.user.is_authenticated:
+                names += _viewer_scopes(request.user.pk)
+            names, gens = _with_period(names, generations(names), lifetime)
+            etag = _etag(request, names, gens)
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                return response
+            return _set_etag(request, view(request, *args, **kwargs), etag)
+        return wrapper
+    return decorator
+
+
+def _conditional_async(view, scopes, personal, lifetime):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return await view(request, *args, **kwargs)
+        names = [SITE, *scopes(**kwargs)]
+        authenticated, gens = await threads.gather(
+            partial(_is_authenticated, request), partial(generations, names)
+        )
+        if personal and authenticated:
+            viewer = _viewer_scopes(request.user.pk)
+            names += viewer
+            gens += await threads.run(generations, viewer)
+        names, gens = _with_period(names, gens, lifetime)
+        etag = _etag(request, names, gens)
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+        response = await view(request, *args, **kwargs)
+        return _set_etag(request, response, etag)
+    return wrapper
+
+
+def cached_page(scopes, personal=False, lifetime=None):
+    """``conditional`` поверх ``cache_anonymous`` с одними областями."""
+    def decorator(view):
+        return conditional(scopes, personal, lifetime)(
+            cache_anonymous(scopes, lifetime)(view)
+        )
+    return decorator
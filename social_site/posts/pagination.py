@@ -0,0 +1,209 @@
+"""Пагинация лент.
+
+По умолчанию используется обычный ``Paginator`` с ``?page=N``. Курсорный
+режим (``?after=`` / ``?before=``) листает ленту по ключу
+``(pub_date, id)`` без OFFSET и без ``COUNT(*)``. Комментарии к посту
+всегда листаются курсором по ``(created, id)`` от старых к новым.
+
+С ``?partial=1`` ленты отдают только следующую порцию постов и маркер
+продолжения (``feed_items.html``) для бесконечной прокрутки.
+"""
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+PER_PAGE = 10
+COMMENTS_PER_PAGE = 50
+PARTIAL = "partial"
+
+
+def encode_token(*parts):
+    raw = "|".join(str(part) for part in parts).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_token(token, size):
+    """Части непрозрачного токена или ``None``, если токен битый."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        parts = raw.decode().split("|")
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    return parts if len(parts) == size else None
+
+
+def encode_cursor(post):
+    return encode_token(post.pub_date.isoformat(), post.id)
+
+
+def encode_comment_cursor(comment):
+    return encode_token(comment.created.isoformat(), comment.id)
+
+
+def decode_cursor(token):
+    """Возвращает ``(pub_date, id)`` или ``None`` для битого курсора."""
+    parts = decode_token(token, 2)
+    if parts is None:
+        return None
+    try:
+        pub_date = parse_datetime(parts[0])
+        post_id = int(parts[1])
+    except ValueError:
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, post_id
+
+
+class CursorPage:
+    encode = staticmethod(encode_cursor)
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f"<CursorPage of {len(self)} items>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return self.encode(self.object_list[len(self.object_list) - 1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return self.encode(self.object_list[0])
+        return None
+
+
+class CursorPaginator:
+    cursor = True
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = per_page
+
+    def get_page(self, after=None, before=None):
+        """Страница после курсора ``after`` или перед курсором ``before``.
+
+        Битый или пустой курсор означает первую страницу.
+        """
+        key = decode_cursor(after) if after else None
+        if key is not None:
+            pub_date, post_id = key
+            posts = self._slice(
+                self.object_list.filter(
+                    Q(pub_date__lt=pub_date)
+                    | Q(pub_date=pub_date, id__lt=post_id)
+                ).order_by("-pub_date", "-id")
+            )
+            return CursorPage(posts[:self.per_page],
+                              has_next=len(posts) > self.per_page,
+                              has_previous=True)
+
+        key = decode_cursor(before) if before else None
+        if key is not None:
+            pub_date, post_id = key
+            posts = self._slice(
+                self.object_list.filter(
+                    Q(pub_date__gt=pub_date)
+                    | Q(pub_date=pub_date, id__gt=post_id)
+                ).order_by("pub_date", "id")
+            )
+            return CursorPage(posts[:self.per_page][::-1],
+                              has_next=True,
+                              has_previous=len(posts) > self.per_page)
+
+        posts = self._slice(self.object_list.order_by("-pub_date", "-id"))
+        return CursorPage(posts[:self.per_page],
+                          has_next=len(posts) > self.per_page,
+                          has_previous=False)
+
+    def _slice(self, queryset):
+        return list(queryset[:self.per_page + 1])
+
+
+class CommentPage(CursorPage):
+    encode = staticmethod(encode_comment_cursor)
+
+
+def comment_page(comments, after=None, per_page=COMMENTS_PER_PAGE):
+    """Страница комментариев после курсора ``after`` вместе с авторами.
+
+    Битый или пустой курсор означает первую страницу. ``object_list`` —
+    уже выполненный QuerySet страницы. Продолжение предлагается, когда
+    страница заполнена целиком: если комментариев ровно на страницу,
+    следующая окажется пустой, зато хватает одного запроса.
+    """
+    comments = comments.select_related("author").order_by("created", "id")
+    key = decode_cursor(after) if after else None
+    if key is not None:
+        created, comment_id = key
+        comments = comments.filter(
+            Q(created__gt=created) | Q(created=created, id__gt=comment_id)
+        )
+    page = comments[:per_page]
+    return CommentPage(page,
+                       has_next=len(page) == per_page,
+                       has_previous=key is not None)
+
+
+def partial_requested(request):
+    return request.GET.get(PARTIAL) == "1"
+
+
+def next_cursor(page):
+    """Курсор продолжения для страницы любого из пагинаторов.
+
+    Для ``Page`` с ``?page=N`` прокрутка дальше идёт курсором после
+    последнего поста страницы.
+    """
+    if isinstance(page, CursorPage):
+        return page.next_cursor
+    if page.has_next() and len(page):
+        return encode_cursor(page[-1])
+    return None
+
+
+def cursor_requested(request):
+    if "after" in request.GET or "before" in request.GET:
+        return True
+    return (getattr(settings, "FEED_CURSOR_PAGINATION", False)
+            and "page" not in request.GET)
+
+
+def paginate(request, object_list, per_page=PER_PAGE):
+    """Возвращает ``(paginator, page)`` для ленты постов."""
+    if cursor_requested(request):
+        paginator = CursorPaginator(object_list, per_page)
+        page = paginator.get_page(after=request.GET.get("after"),
+                                  before=request.GET.get("before"))
+        return paginator, page
+    paginator = Paginator(object_list, per_page)
+    return paginator, paginator.get_page(request.GET.get("page"))
@@ -0,0 +1,157 @@
+"""Рекомендации «на кого подписаться».
+
+Считаются пакетно командой ``rebuild_recommendations`` по таблицам
+``Follow`` и ``Comment``. Оценка кандидата для пользователя — сумма двух
+строк произведений разреженных матриц:
+
+* друзья друзей — строка ``A·A`` матрицы подписок ``A``: на кого подписаны
+  те, на кого подписан пользователь;
+* совместная активность — строка ``C·Cᵀ`` матрицы «пользователь × пост»
+  по комментариям с весом ``COMMENT_WEIGHT``: кто комментирует те же посты.
+
+Матрицы хранятся строками (CSR) в ``array("I")``, умножение строки на
+матрицу — ``Counter.update`` по строкам соседей, то есть цикл на C без
+numpy. Строки длиннее ``HUB_LIMIT`` обрезаются (для постов — пропускаются),
+поэтому работа растёт линейно от числа рёбер. Для каждого пользователя
+в ``Recommendation`` сохраняется top-K, и панель читает одну строку по
+первичному ключу.
+"""
+import heapq
+from array import array
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import follow_graph, page_cache
+from .models import Comment, Follow, Recommendation, User
+
+
+TYPECODE = "I"
+HUB_LIMIT = 200
+COMMENT_WEIGHT = 0.5
+BATCH_SIZE = 500
+CHUNK_SIZE = 10000
+
+
+def top_k():
+    return getattr(settings, "RECOMMENDATIONS_TOP_K", 20)
+
+
+def panel_size():
+    return getattr(settings, "RECOMMENDATIONS_PANEL_SIZE", 5)
+
+
+def _rows(pairs):
+    """Строки разреженной матрицы из пар ``(строка, столбец)``."""
+    rows = defaultdict(lambda: array(TYPECODE))
+    for row, column in pairs:
+        rows[row].append(column)
+    return rows
+
+
+def _row(rows, key):
+    return rows.get(key, ())[:HUB_LIMIT]
+
+
+def compute(limit=None):
+    """Пары ``(user_id, [(author_id, score), ...])`` по убыванию оценки."""
+    limit = limit or top_k()
+    followees = _rows(Follow.objects.values_list(
+        "user_id", "author_id"
+    ).iterator(chunk_size=CHUNK_SIZE))
+    commented = _rows(Comment.objects.filter(post__isnull=False).values_list(
+        "author_id", "post_id"
+    ).distinct().iterator(chunk_size=CHUNK_SIZE))
+    commenters = _rows((post_id, user_id)
+                       for user_id, posts in commented.items()
+                       for post_id in posts)
+
+    for user_id in followees.keys() | commented.keys():
+        scores = Counter()
+        for author_id in _row(followees, user_id):
+            scores.update(_row(followees, author_id))
+        together = Counter()
+        for post_id in _row(commented, user_id):
+            users = commenters[post_id]
+            if len(users) <= HUB_LIMIT:
+                together.update(users)
+        for other_id, count in together.items():
+            scores[other_id] += COMMENT_WEIGHT * count
+
+        scores.pop(user_id, None)
+        for author_id in followees.get(user_id, ()):
+            scores.pop(author_id, None)
+        if scores:
+            yield user_id, heapq.nlargest(
+                limit, scores.items(), key=lambda item: (item[1], -item[0])
+            )
+
+
+def _usernames(ids):
+    ids, names = list(ids), {}
+    for start in range(0, len(ids), BATCH_SIZE):
+        names.update(User.objects.filter(
+            id__in=ids[start:start + BATCH_SIZE]
+        ).values_list("id", "username"))
+    return names
+
+
+def _store(batch):
+    names = _usernames({author_id for _, top in batch
+                        for author_id, _ in top})
+    with transaction.atomic():
+        Recommendation.objects.filter(
+            user__in=[user_id for user_id, _ in batch]
+        ).delete()
+        Recommendation.objects.bulk_create([
+            Recommendation(user_id=user_id,
+                           authors=[[author_id, names[author_id]]
+                                    for author_id, _ in top
+                                    if author_id in names])
+            for user_id, top in batch
+        ])
+    return len(batch)
+
+
+def rebuild(limit=None):
+    """Пересчитывает рекомендации всех пользователей, возвращает их число.
+
+    Пишет короткими транзакциями по ``BATCH_SIZE`` пользователей, чтобы
+    не держать блокировку записи всё время счёта.
+    """
+    started = timezone.now()
+    total = 0
+    results = compute(limit)
+    while True:
+        batch = list(islice(results, BATCH_SIZE))
+        if not batch:
+            break
+        total += _store(batch)
+    # У этих пользователей больше нет кандидатов.
+    Recommendation.objects.filter(computed__lt=started).delete()
+    page_cache.bump(page_cache.RECOMMENDATIONS)
+    return total
+
+
+def for_user(user, limit=None):
+    """Панель для ``user``: одна строка ``Recommendation`` по ключу.
+
+    Авторы, на которых пользователь подписался после пересчёта,
+    отбрасываются по графу подписок из кэша.
+    """
+    if not user.is_authenticated:
+        return []
+    authors = Recommendation.objects.filter(user=user.id).values_list(
+        "authors", flat=True
+    ).first()
+    if not authors:
+        return []
+    followed = follow_graph.followed_among(
+        user.id, [author_id for author_id, _ in authors]
+    )
+    return [{"id": author_id, "username": username}
+            for author_id, username in authors
+            if author_id not in followed][:limit or panel_size()]
@@ -0,0 +1,151 @@
+"""Чтение лент с реплик базы данных.
+
+``ReplicaRouter`` отправляет чтения вьюх, помеченных ``replica_reads``,
+на одну из реплик из ``settings.DATABASE_REPLICAS`` (одну на весь
+запрос, чтобы счётчик страниц и сами посты были из одного снимка), а все
+записи и остальные чтения — в ``default``.
+
+Реплика отстаёт от основной базы, поэтому после записи (пост,
+комментарий, подписка) ``ReplicaPinningMiddleware`` ставит cookie, и
+``REPLICA_PIN_SECONDS`` секунд запросы этого браузера читают из
+``default``: после редиректа с ``new_post`` автор видит свой пост.
+"""
+import asyncio
+import contextvars
+import random
+from functools import wraps
+
+from django.conf import settings
+
+
+PIN_COOKIE = "replica_pin"
+
+_state = contextvars.ContextVar("replica_state", default=None)
+
+
+class _State:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.reads = False
+        self.replica = None
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def pin_seconds():
+    return getattr(settings, "REPLICA_PIN_SECONDS", 15)
+
+
+def used():
+    """Читал ли текущий запрос с реплики."""
+    state = _state.get()
+    return state is not None and state.replica is not None
+
+
+def _enter():
+    state = _state.get()
+    token = None
+    if state is None:
+        state = _State()
+        token = _state.set(state)
+    state.reads = True
+    return state, token
+
+
+def _exit(state, token):
+    state.reads = False
+    if token is not None:
+        _state.reset(token)
+
+
+def replica_reads(view):
+    """Разрешает вьюхе читать с реплики. Подходит и для асинхронных вьюх."""
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            state, token = _enter()
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _exit(state, token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state, token = _enter()
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _exit(state, token)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (state is None or not state.reads or state.pinned
+                or state.wrote or not replicas()):
+            return "default"
+        if state.replica is None:
+            state.replica = random.choice(replicas())
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {"default", *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему вместе с данными из основной базы.
+        return db not in replicas()
+
+
+class ReplicaPinningMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        state, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(state, response)
+
+    @staticmethod
+    def _start(request):
+        state = _State(pinned=PIN_COOKIE in request.COOKIES)
+        return state, _state.set(state)
+
+    @staticmethod
+    def _finish(state, response):
+        if state.wrote and replicas():
+            response.set_cookie(PIN_COOKIE, "1", max_age=pin_seconds(),
+                                httponly=True, samesite="Lax")
+        return response
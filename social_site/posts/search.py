@@ -0,0 +1,252 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+Бэкенд задаётся настройкой ``SEARCH_BACKEND``. ``SqliteFTSBackend``
+хранит текст постов и комментариев в виртуальной таблице FTS5 и
+ранжирует посты по BM25; для других СУБД (например, tsvector в
+PostgreSQL) достаточно реализовать интерфейс ``SearchBackend``.
+Индекс обновляется сигналами сохранения и удаления ``Post``/``Comment``.
+"""
+import re
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Comment, Post
+
+
+BATCH_SIZE = 1000
+
+_backend = None
+
+
+def terms(query):
+    return re.findall(r"\w+", query.lower())[:16]
+
+
+class SearchBackend:
+    def index_post(self, post):
+        raise NotImplementedError
+
+    def index_comment(self, comment):
+        raise NotImplementedError
+
+    def remove_post(self, post_id):
+        raise NotImplementedError
+
+    def remove_comment(self, comment_id):
+        raise NotImplementedError
+
+    def clear(self, using=DEFAULT_DB_ALIAS):
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Переиндексирует все посты и комментарии, возвращает их число."""
+        raise NotImplementedError
+
+    def search(self, query, group=None, author=None, after=None, limit=10):
+        """Список ``(post_id, score)``, лучшие первыми.
+
+        ``group`` и ``author`` — slug группы и имя автора, ``after`` —
+        пара ``(score, post_id)`` последнего результата предыдущей
+        страницы. Чем меньше ``score``, тем выше пост в выдаче.
+        """
+        raise NotImplementedError
+
+    def search_texts(self, query, limit=10):
+        """Id постов, в собственном тексте которых есть все слова запроса."""
+        raise NotImplementedError
+
+    def search_comments(self, query, limit=10):
+        """Id комментариев, в тексте которых есть все слова запроса."""
+        raise NotImplementedError
+
+
+class SqliteFTSBackend(SearchBackend):
+    table = "posts_search"
+
+    # Посты и комментарии делят rowid: у постов чётные, у комментариев
+    # нечётные, поэтому удаление любого документа идёт по первичному ключу.
+    @staticmethod
+    def post_rowid(post_id):
+        return post_id * 2
+
+    @staticmethod
+    def comment_rowid(comment_id):
+        return comment_id * 2 + 1
+
+    def _execute(self, sql, params=(), using=DEFAULT_DB_ALIAS):
+        with connections[using].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _replace(self, rows):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (rowid, body, post_id) "
+                f"VALUES (%s, %s, %s)",
+                rows,
+            )
+
+    def _delete(self, rowid):
+        self._execute(f"DELETE FROM {self.table} WHERE rowid = %s", [rowid])
+
+    def index_post(self, post):
+        self._replace([(self.post_rowid(post.id), post.text or "", post.id)])
+
+    def index_comment(self, comment):
+        self._replace([(self.comment_rowid(comment.id), comment.text or "",
+                        comment.post_id)])
+
+    def remove_post(self, post_id):
+        self._delete(self.post_rowid(post_id))
+
+    def remove_comment(self, comment_id):
+        self._delete(self.comment_rowid(comment_id))
+
+    def clear(self, using=DEFAULT_DB_ALIAS):
+        self._execute(f"DELETE FROM {self.table}", using=using)
+
+    def rebuild(self):
+        self.clear()
+        total = 0
+        sources = (
+            (Post.objects.values_list("id", "text", "id"), self.post_rowid),
+            (Comment.objects.exclude(post=None).values_list("id", "text",
+                                                            "post_id"),
+             self.comment_rowid),
+        )
+        for queryset, rowid in sources:
+            batch = []
+            for object_id, text, post_id in queryset.order_by().iterator():
+                batch.append((rowid(object_id), text or "", post_id))
+                if len(batch) == BATCH_SIZE:
+                    self._replace(batch)
+                    total += len(batch)
+                    batch = []
+            self._replace(batch)
+            total += len(batch)
+        self._execute(f"INSERT INTO {self.table}({self.table}) "
+                      f"VALUES ('optimize')")
+        return total
+
+    def search(self, query, group=None, author=None, after=None, limit=10):
+        words = terms(query)
+        if not words:
+            return []
+        match = " ".join(f'"{word}"*' for word in words)
+        joins, where, params = [], [], [match]
+        if group:
+            joins.append("JOIN posts_group g ON g.id = p.group_id")
+            where.append("AND g.slug = %s")
+            params.append(group)
+        if author:
+            joins.append("JOIN auth_user u ON u.id = p.author_id")
+            where.append("AND u.username = %s")
+            params.append(author)
+        having = ""
+        if after is not None:
+            having = "HAVING score > %s OR (score = %s AND p.id > %s)"
+            params += [after[0], after[0], after[1]]
+        params.append(limit)
+        # Скрытая колонка rank у FTS5 — это bm25(); документ поста и его
+        # комментарии схлопываются в пост с лучшим рангом.
+        return self._execute(
+            f"""
+            SELECT p.id, MIN(hits.rank) AS score
+            FROM (SELECT post_id, rank FROM {self.table}
+                  WHERE {self.table} MATCH %s) AS hits
+            JOIN posts_post p ON p.id = hits.post_id
+            {" ".join(joins)}
+            WHERE 1 = 1 {" ".join(where)}
+            GROUP BY p.id
+            {having}
+            ORDER BY score, p.id
+            LIMIT %s
+            """,
+            params,
+        )
+
+    def _search_documents(self, query, parity, limit):
+        words = terms(query)
+        if not words:
+            return []
+        match = " ".join(f'"{word}"*' for word in words)
+        rows = self._execute(
+            f"SELECT rowid FROM {self.table} "
+            f"WHERE {self.table} MATCH %s AND rowid %% 2 = %s "
+            f"ORDER BY rank LIMIT %s",
+            [match, parity, limit],
+        )
+        return [rowid // 2 for rowid, in rows]
+
+    def search_texts(self, query, limit=10):
+        return self._search_documents(query, 0, limit)
+
+    def search_comments(self, query, limit=10):
+        return self._search_documents(query, 1, limit)
+
+
+class LikeSearchBackend(SearchBackend):
+    """Поиск без индекса через ``icontains``, для СУБД без своего бэкенда."""
+
+    def index_post(self, post):
+        pass
+
+    def index_comment(self, comment):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+    def remove_comment(self, comment_id):
+        pass
+
+    def clear(self, using=DEFAULT_DB_ALIAS):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def search(self, query, group=None, author=None, after=None, limit=10):
+        words = terms(query)
+        if not words:
+            return []
+        posts = Post.objects.all()
+        for word in words:
+            posts = posts.filter(Q(text__icontains=word)
+                                 | Q(comments__text__icontains=word))
+        if group:
+            posts = posts.filter(group__slug=group)
+        if author:
+            posts = posts.filter(author__username=author)
+        if after is not None:
+            posts = posts.filter(id__gt=after[1])
+        ids = posts.order_by("id").values_list("id", flat=True).distinct()
+        return [(post_id, 0.0) for post_id in ids[:limit]]
+
+    @staticmethod
+    def _matching(queryset, query, limit):
+        words = terms(query)
+        if not words:
+            return []
+        for word in words:
+            queryset = queryset.filter(text__icontains=word)
+        return list(queryset.order_by("id").values_list("id", flat=True)
+                    [:limit])
+
+    def search_texts(self, query, limit=10):
+        return self._matching(Post.objects.all(), query, limit)
+
+    def search_comments(self, query, limit=10):
+        return self._matching(Comment.objects.all(), query, limit)
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(getattr(
+            settings, "SEARCH_BACKEND", "posts.search.SqliteFTSBackend"
+        ))()
+    return _backend
@@ -0,0 +1,159 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (counters, feed, follow_graph, page_cache, search, thumbnails,
+               trending)
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def post_scopes(post):
+    scopes = [page_cache.POSTS,
+              page_cache.post_scope(post.id),
+              page_cache.author_scope(post.author.username)]
+    if post.group_id:
+        scopes.append(page_cache.group_scope(post.group.slug))
+    return scopes
+
+
+# Поля пользователя, которые выводятся на страницах профиля и постов.
+USER_PAGE_FIELDS = ("username", "first_name", "last_name")
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not instance.pk:
+        return
+    if update_fields is not None and not set(update_fields) & set(
+            USER_PAGE_FIELDS):
+        return
+    instance._old_page_fields = User.objects.filter(
+        pk=instance.pk
+    ).values_list(*USER_PAGE_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+    old = getattr(instance, "_old_page_fields", None)
+    instance._old_page_fields = None
+    new = tuple(getattr(instance, field) for field in USER_PAGE_FIELDS)
+    if old is None or old == new:
+        return
+    scopes = [page_cache.author_scope(instance.username)]
+    if old[0] != instance.username:
+        # Имя пользователя есть в ссылках карточек всех лент.
+        scopes += [page_cache.author_scope(old[0]), page_cache.POSTS]
+    page_cache.bump(*scopes)
+
+
+@receiver([post_save, post_delete], sender=Group)
+def group_changed(sender, **kwargs):
+    page_cache.bump(page_cache.SITE)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._old_group_slug, instance._old_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list("group__slug", "image").first() or (None, None)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_user(instance.author_id, posts_count=1)
+        feed.fan_out_post(instance)
+    update_fields = kwargs.get("update_fields")
+    if created or update_fields is None or "text" in update_fields:
+        search.get_backend().index_post(instance)
+    image_saved = update_fields is None or "image" in update_fields
+    if instance.image and image_saved and not thumbnails.ready(instance):
+        thumbnails.schedule(instance.image.name)
+    old_image = getattr(instance, "_old_image", None)
+    if image_saved and old_image and old_image != instance.image.name:
+        thumbnails.discard(old_image)
+    scopes = post_scopes(instance)
+    old_slug = getattr(instance, "_old_group_slug", None)
+    if old_slug:
+        scopes.append(page_cache.group_scope(old_slug))
+    page_cache.bump(*scopes)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, posts_count=-1)
+    search.get_backend().remove_post(instance.id)
+    thumbnails.discard(instance.image.name)
+    page_cache.bump(*post_scopes(instance))
+
+
+def comment_changed(comment):
+    post = Post.objects.select_related("author", "group").filter(
+        id=comment.post_id
+    ).first()
+    if post is not None:
+        page_cache.bump(*post_scopes(post))
+    return post
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or not instance.post_id:
+        return
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+    search.get_backend().index_comment(instance)
+    post = comment_changed(instance)
+    if created and post is not None:
+        trending.record_comment(post)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id:
+        counters.bump_comments(instance.post_id, -1)
+        search.get_backend().remove_comment(instance.id)
+        comment_changed(instance)
+
+
+def follow_changed(follow):
+    usernames = User.objects.filter(
+        id__in=[follow.user_id, follow.author_id]
+    ).values_list("username", flat=True)
+    page_cache.bump(page_cache.viewer_scope(follow.user_id),
+                    *[page_cache.author_scope(name) for name in usernames])
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_user(instance.user_id, following_count=1)
+        counters.bump_user(instance.author_id, followers_count=1)
+        feed.add_author(instance.user_id, instance.author_id)
+        follow_graph.add(instance.user_id, instance.author_id)
+        follow_changed(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.user_id, following_count=-1)
+    counters.bump_user(instance.author_id, followers_count=-1)
+    feed.remove_author(instance.user_id, instance.author_id)
+    follow_graph.remove(instance.user_id, instance.author_id)
+    follow_changed(instance)
+
+
+def search_index_reset(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    # После flush (в том числе между тестами) таблицы моделей пусты, а
+    # виртуальную таблицу поиска Django не знает и не очищает. После
+    # отката миграций таблиц постов или поиска может не быть.
+    tables = connections[using].introspection.table_names()
+    if (Post._meta.db_table in tables
+            and search.SqliteFTSBackend.table in tables
+            and not Post.objects.using(using).exists()):
+        search.get_backend().clear(using=using)
@@ -0,0 +1,11 @@
+from django import template
+
+from posts import pagination
+
+
+register = template.Library()
+
+
+@register.filter
+def next_cursor(page):
+    return pagination.next_cursor(page)
@@ -0,0 +1,17 @@
+from django import template
+
+from posts import thumbnails
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_image(post):
+    """``srcset`` готовых вариантов; если их нет, ставит генерацию в очередь."""
+    if not post.image:
+        return None
+    if not thumbnails.ready(post):
+        thumbnails.schedule(post.image.name)
+        return None
+    return thumbnails.srcsets(post)
@@ -0,0 +1,46 @@
+"""Синхронный код Django (ORM, кэш, шаблоны) из асинхронных вьюх.
+
+ORM в Django 3.1 синхронный, поэтому асинхронные вьюхи выполняют его в
+пуле потоков. ``run`` не привязан к единственному «синхронному» потоку
+(``thread_sensitive=False``), так что независимые вызовы из ``gather``
+идут параллельно, каждый со своим соединением с БД.
+
+Соединения потоков пула живут между запросами: пул ограничен, а
+переподключение на каждый вызов съедает выигрыш от параллельности.
+Закрываются только соединения, сломанные ошибкой, — как это делает
+``close_old_connections`` в конце обычного запроса.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+
+
+def _close_unusable():
+    for connection in connections.all():
+        if connection.connection is None or not connection.errors_occurred:
+            continue
+        if connection.is_usable():
+            connection.errors_occurred = False
+        else:
+            connection.close()
+
+
+def _call(function, args, kwargs):
+    try:
+        return function(*args, **kwargs)
+    finally:
+        _close_unusable()
+
+
+async def run(function, *args, **kwargs):
+    return await sync_to_async(_call, thread_sensitive=False)(function, args,
+                                                              kwargs)
+
+
+async def gather(*functions):
+    """Выполняет функции без аргументов параллельно.
+
+    Результаты возвращаются в порядке функций.
+    """
+    return await asyncio.gather(*(run(function) for function in functions))
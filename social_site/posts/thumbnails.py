@@ -0,0 +1,165 @@
+"""Фоновая генерация адаптивных вариантов картинок постов.
+
+Для каждой картинки один раз строятся кропы 960x339 в нескольких
+ширинах (``WIDTHS``) в WebP и JPEG и кладутся рядом с оригиналом в
+``MEDIA_ROOT/posts/`` под детерминированными именами вида
+``posts/photo.640w.webp``. Карточка отдаёт их через ``srcset``.
+
+Шаблон ничего не строит сам: пока варианты не готовы, карточка
+показывает оригинал, а картинка ставится в очередь. Генерация идёт в пуле
+потоков (``THUMBNAIL_WORKERS``; 0 — синхронно) после сохранения поста с
+картинкой. Готовность хранится в ``Post.image_variants``; её обновление
+через ``save()`` сбрасывает кэши карточки и страниц. Когда картинку
+поста заменяют или пост удаляют, её варианты удаляются вслед за ним.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from .models import Post
+
+
+WIDTHS = (320, 640, 960)
+ASPECT = 339 / 960
+FORMATS = (
+    ("webp", "WEBP", {"quality": 80, "method": 4}),
+    ("jpg", "JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+)
+FAILURE_TIMEOUT = 60 * 60
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def workers():
+    return getattr(settings, "THUMBNAIL_WORKERS", 2)
+
+
+def variant_name(name, width, ext):
+    return f"{os.path.splitext(name)[0]}.{width}w.{ext}"
+
+
+def ready(post):
+    return bool(post.image) and post.image_variants == post.image.name
+
+
+def srcsets(post):
+    """``srcset`` для WebP и JPEG и запасной ``src`` готового поста."""
+    name = post.image.name
+    result = {"src": default_storage.url(variant_name(name, WIDTHS[-1],
+                                                      "jpg"))}
+    for ext, _, _ in FORMATS:
+        result[ext] = ", ".join(
+            f"{default_storage.url(variant_name(name, width, ext))} {width}w"
+            for width in WIDTHS
+        )
+    return result
+
+
+def build_variants(name):
+    with default_storage.open(name) as source:
+        image = Image.open(source)
+        image.load()
+    image = ImageOps.exif_transpose(image).convert("RGB")
+    for width in WIDTHS:
+        size = (width, round(width * ASPECT))
+        variant = ImageOps.fit(image, size, Image.LANCZOS)
+        for ext, image_format, options in FORMATS:
+            buffer = BytesIO()
+            variant.save(buffer, image_format, **options)
+            target = variant_name(name, width, ext)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            default_storage.save(target, ContentFile(buffer.getvalue()))
+
+
+def variant_names(name):
+    return [variant_name(name, width, ext)
+            for width in WIDTHS for ext, _, _ in FORMATS]
+
+
+def delete_variants(name):
+    """Удаляет варианты картинки, если ею больше не пользуется ни один пост."""
+    if not name or Post.objects.filter(image=name).exists():
+        return
+    try:
+        for target in variant_names(name):
+            if default_storage.exists(target):
+                default_storage.delete(target)
+    except SuspiciousFileOperation:
+        # Картинка лежит вне хранилища, вариантов для неё не строили.
+        pass
+    except OSError:
+        logger.exception("Не удалось удалить варианты картинки %s", name)
+
+
+def discard(name):
+    """Удаляет варианты после коммита текущей транзакции."""
+    if name:
+        transaction.on_commit(lambda: delete_variants(name))
+
+
+def _failure_key(name):
+    return f"thumbnail-failed:{name}"
+
+
+def generate(name):
+    """Строит варианты и отмечает посты с этой картинкой готовыми."""
+    try:
+        build_variants(name)
+        for post in Post.objects.filter(image=name):
+            post.image_variants = name
+            post.save(update_fields=["image_variants", "updated"])
+        return True
+    except Exception:
+        logger.exception("Не удалось построить варианты картинки %s", name)
+        cache.set(_failure_key(name), True, FAILURE_TIMEOUT)
+        return False
+    finally:
+        with _lock:
+            _pending.discard(name)
+
+
+def _generate_in_worker(name):
+    try:
+        return generate(name)
+    finally:
+        connections.close_all()
+
+
+def _submit(name):
+    global _executor
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    if not workers():
+        generate(name)
+        return
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers(),
+                                           thread_name_prefix="thumbnails")
+    _executor.submit(_generate_in_worker, name)
+
+
+def schedule(name):
+    """Ставит картинку в очередь после коммита текущей транзакции."""
+    if not name or cache.get(_failure_key(name)):
+        return
+    # В _pending картинка попадает уже в _submit: после отката она не
+    # осталась бы «в очереди» навсегда.
+    transaction.on_commit(lambda: _submit(name))
@@ -0,0 +1,179 @@
+"""Популярные посты и сообщества с затухающей оценкой.
+
+Каждое событие — комментарий или выборочный просмотр поста (их копит
+буфер ``view_counts`` и передаёт пачкой при записи просмотров) —
+добавляет к оценке поста и его сообщества вес, который вдвое затухает за
+``TRENDING_HALF_LIFE`` секунд.
+В ``TrendingScore`` хранится логарифм суммы в масштабе неподвижной эпохи:
+событие с весом ``w`` в момент ``t`` даёт ``ln(w) + t / τ``. Затухание
+одинаково для всех строк, поэтому порядок по ``score`` — это порядок по
+текущей оценке без пересчёта, а событие — один атомарный UPDATE
+``score = log-add(score, x)`` вместо GROUP BY по ``Comment``.
+
+Top-N читается по индексу ``(kind, -score)`` и лежит в кэше
+``TRENDING_REFRESH`` секунд; страница ``/trending/`` в кэше страниц живёт
+столько же. Команда ``refresh_trending`` по расписанию удаляет затухшие
+строки и обновляет списки.
+"""
+import math
+import random
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+
+from . import page_cache
+from .models import Group, Post, TrendingScore
+
+
+COMMENT_WEIGHT = 1.0
+VIEW_WEIGHT = 0.1
+# Строки, затухшие ниже этого веса, удаляет prune().
+MIN_WEIGHT = 0.01
+# Запись идёт в основную базу явно, мимо роутера: просмотр не должен
+# закреплять читателя за основной базой (ReplicaPinningMiddleware).
+DATABASE = "default"
+
+
+def half_life():
+    return getattr(settings, "TRENDING_HALF_LIFE", 60 * 60 * 6)
+
+
+def refresh_interval():
+    return getattr(settings, "TRENDING_REFRESH", 60)
+
+
+def size():
+    return getattr(settings, "TRENDING_SIZE", 10)
+
+
+def view_sample_rate():
+    return getattr(settings, "TRENDING_VIEW_SAMPLE_RATE", 0.1)
+
+
+def point(weight, now=None):
+    """Вклад события с весом ``weight`` в момент ``now`` в масштабе эпохи."""
+    now = time.time() if now is None else now
+    return math.log(weight) + now * math.log(2) / half_life()
+
+
+def current(score, now=None):
+    """Текущая затухшая сумма весов по сохранённому ``score``."""
+    return math.exp(score - point(1, now))
+
+
+def _log_add(x):
+    # ln(e^a + e^x) = max(a, x) + ln(1 + e^-|a - x|), без переполнения.
+    x = Value(x, output_field=FloatField())
+    one = Value(1.0, output_field=FloatField())
+    return Greatest(F("score"), x) + Ln(one + Exp(-Abs(F("score") - x)))
+
+
+def _bump(kind, object_id, value):
+    scores = TrendingScore.objects.using(DATABASE).filter(kind=kind,
+                                                          object_id=object_id)
+    if scores.update(score=_log_add(value)):
+        return
+    try:
+        with transaction.atomic(using=DATABASE):
+            scores.create(kind=kind, object_id=object_id, score=value)
+    except IntegrityError:
+        scores.update(score=_log_add(value))
+
+
+def record(post_id, group_id, weight, now=None):
+    value = point(weight, now)
+    _bump(TrendingScore.POST, post_id, value)
+    if group_id:
+        _bump(TrendingScore.GROUP, group_id, value)
+
+
+def record_comment(post):
+    record(post.id, post.group_id, COMMENT_WEIGHT)
+
+
+def sampled():
+    """Попадает ли очередной просмотр в выборку."""
+    return random.random() < view_sample_rate()
+
+
+def record_views(counts, now=None):
+    """Выборочные просмотры ``{post_id: число}``: вес поправлен на долю
+    выборки, посты одного сообщества складываются в один UPDATE."""
+    if not counts:
+        return
+    weight = VIEW_WEIGHT / view_sample_rate()
+    groups = dict(Post.objects.using(DATABASE).filter(
+        id__in=list(counts)
+    ).values_list("id", "group_id"))
+    by_group = Counter()
+    for post_id, count in counts.items():
+        if post_id not in groups:
+            continue
+        _bump(TrendingScore.POST, post_id, point(weight * count, now))
+        if groups[post_id]:
+            by_group[groups[post_id]] += count
+    for group_id, count in by_group.items():
+        _bump(TrendingScore.GROUP, group_id, point(weight * count, now))
+
+
+def _key(kind):
+    return f"trending:{kind}"
+
+
+def _ranked(kind, now=None):
+    return list(TrendingScore.objects.filter(
+        kind=kind, score__gte=point(MIN_WEIGHT, now)
+    ).order_by("-score").values_list("object_id", flat=True)[:size()])
+
+
+def refresh(kind):
+    """Перечитывает top-N ``kind`` из базы и кладёт в кэш.
+
+    Если порядок изменился, сбрасывает страницы с областью этого списка
+    (``page_cache.TRENDING_POSTS`` или ``page_cache.TRENDING_GROUPS``).
+    """
+    ids = _ranked(kind)
+    scope = page_cache.TRENDING_POSTS
+    if kind == TrendingScore.GROUP:
+        scope = page_cache.TRENDING_GROUPS
+        groups = Group.objects.in_bulk(ids)
+        items = [{"slug": groups[group_id].slug,
+                  "title": groups[group_id].title}
+                 for group_id in ids if group_id in groups]
+    else:
+        items = ids
+    cache.set(_key(kind), items, refresh_interval())
+    if cache.get(_key(kind) + ":last") != items:
+        cache.set(_key(kind) + ":last", items, None)
+        page_cache.bump(scope)
+    return items
+
+
+def _top(kind):
+    items = cache.get(_key(kind))
+    return refresh(kind) if items is None else items
+
+
+def top_posts():
+    """Популярные посты в порядке оценки, готовые для ``post_item.html``."""
+    ids = _top(TrendingScore.POST)
+    posts = Post.objects.feed().in_bulk(ids)
+    return [posts[post_id] for post_id in ids if post_id in posts]
+
+
+def top_groups():
+    """Популярные сообщества: ``[{"slug": ..., "title": ...}, ...]``."""
+    return _top(TrendingScore.GROUP)
+
+
+def prune(now=None):
+    """Удаляет затухшие строки, возвращает их число."""
+    deleted, _ = TrendingScore.objects.filter(
+        score__lt=point(MIN_WEIGHT, now)
+    ).delete()
+    return deleted
@@ -1,15 +1,28 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
+
+
+def view(name):
+    """Асинхронная версия вьюхи, если её имя есть в ``ASYNC_VIEWS``."""
+    if name in getattr(settings, "ASYNC_VIEWS", ()):
+        return getattr(async_views, name)
+    return getattr(views, name)
 
 
 urlpatterns = [
-    path("", views.index, name="index"),
-    path("follow/", views.follow_index, name="follow_index"),
-    path("group/<slug:slug>", views.group_posts, name="groups"),
+    path("", view("index"), name="index"),
+    path("follow/", view("follow_index"), name="follow_index"),
+    path("group/<slug:slug>", view("group_posts"), name="groups"),
     path("new/", views.new_post, name="new_post"),
-    path("<str:username>/", views.profile, name="profile"),
-    path("<str:username>/<int:post_id>/", views.post_view, name="post"),
+    path("search/", views.search, name="search"),
+    path("trending/", views.trending_view, name="trending"),
+    path("<str:username>/", view("profile"), name="profile"),
+    path("<str:username>/<int:post_id>/", view("post_view"), name="post"),
+    path("<str:username>/<int:post_id>/comments/",
+         view("comments"),
+         name="comments"),
     path("<str:username>/<int:post_id>/edit/",
          views.post_edit,
          name="post_edit"),
@@ -0,0 +1,165 @@
+"""Счётчики просмотров постов с пакетной записью.
+
+``UPDATE ... SET views = views + 1`` на каждый GET упирался бы в
+блокировку записи SQLite. Просмотры копятся в памяти процесса и
+записываются несколькими UPDATE в одной транзакции (по одному на каждое
+встретившееся приращение), когда с прошлой записи прошло
+``VIEW_COUNTS_FLUSH_SECONDS`` секунд или накопилось
+``VIEW_COUNTS_FLUSH_EVENTS`` просмотров. Срок проверяется только при
+очередном просмотре: без трафика остаток ждёт следующего просмотра или
+выхода, поэтому граница потерь при падении процесса — не больше
+``VIEW_COUNTS_FLUSH_EVENTS`` просмотров, а не ``VIEW_COUNTS_FLUSH_SECONDS``
+секунд. При обычном завершении буфер записывается из ``atexit``.
+
+В той же транзакции пишутся выборочные просмотры для ``trending``: запрос
+лишь отмечает их в буфере, поэтому оценка популярного отстаёт не больше,
+чем счётчик. Если запись не удалась (например, ``database is locked``),
+просмотры возвращаются в буфер и уйдут со следующей записью; пока база недоступна,
+буфер может превысить эту границу.
+
+Запись просмотров не сбрасывает поколения ``page_cache``, иначе ленты
+пересобирались бы после каждой записи. Поэтому на страницах из кэша число
+просмотров отстаёт: оно обновится, когда страницу соберут заново.
+"""
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+
+from . import threads, trending
+from .models import Post
+
+
+logger = logging.getLogger(__name__)
+
+DATABASE = trending.DATABASE
+
+_lock = threading.Lock()
+_pending = Counter()
+# Просмотры из выборки популярного, подмножество _pending.
+_sampled = Counter()
+_events = 0
+_flushed = time.monotonic()
+
+
+def flush_seconds():
+    return getattr(settings, "VIEW_COUNTS_FLUSH_SECONDS", 10)
+
+
+def flush_events():
+    return getattr(settings, "VIEW_COUNTS_FLUSH_EVENTS", 100)
+
+
+def add(post_id, sampled=False):
+    """Учитывает просмотр в буфере; ``True``, если пора записывать."""
+    global _events
+    with _lock:
+        _pending[post_id] += 1
+        if sampled:
+            _sampled[post_id] += 1
+        _events += 1
+        return (_events >= flush_events()
+                or time.monotonic() - _flushed >= flush_seconds())
+
+
+def _take():
+    global _events, _flushed
+    with _lock:
+        pending, sampled = _pending.copy(), _sampled.copy()
+        _pending.clear()
+        _sampled.clear()
+        _events = 0
+        _flushed = time.monotonic()
+    return pending, sampled
+
+
+def _restore(pending, sampled):
+    with _lock:
+        _pending.update(pending)
+        _sampled.update(sampled)
+
+
+def flush():
+    """Записывает накопленные просмотры, возвращает число постов."""
+    pending, sampled = _take()
+    if not pending:
+        return 0
+    by_delta = defaultdict(list)
+    for post_id, delta in pending.items():
+        by_delta[delta].append(post_id)
+    try:
+        with transaction.atomic(using=DATABASE):
+            for delta, post_ids in by_delta.items():
+                Post.objects.using(DATABASE).filter(id__in=post_ids).update(
+                    views=F("views") + delta
+                )
+            trending.record_views(sampled)
+    except DatabaseError:
+        _restore(pending, sampled)
+        raise
+    return len(pending)
+
+
+def reset():
+    """Отбрасывает буфер (для тестов)."""
+    _take()
+
+
+def _flush_at_exit():
+    try:
+        flush()
+    except DatabaseError:
+        logger.exception("Не удалось записать просмотры при выходе")
+
+
+atexit.register(_flush_at_exit)
+
+
+def _viewed(response):
+    return response.status_code in (200, 304)
+
+
+def _write():
+    # Страница уже готова: ошибка записи не должна превращаться в 500.
+    try:
+        flush()
+    except DatabaseError:
+        logger.exception("Не удалось записать просмотры")
+
+
+def _add(post_id):
+    return add(post_id, sampled=trending.sampled())
+
+
+def count_views(view):
+    """Считает просмотры поста, включая ответы из кэша и 304.
+
+    Ставится снаружи ``cached_page``, заодно отмечает выборочные
+    просмотры для ``trending``. Подходит и для асинхронных вьюх: в пул
+    потоков уходит только запись в базу.
+    """
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            response = await view(request, *args, **kwargs)
+            if _viewed(response):
+                if _add(kwargs["post_id"]):
+                    await threads.run(_write)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if _viewed(response):
+            if _add(kwargs["post_id"]):
+                _write()
+        return response
+    return wrapper
@@ -1,39 +1,95 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-
-from django.views.decorators.cache import cache_page
 
+from . import (counters, feed, follow_graph, recommendations, trending,
+               view_counts)
+from . import search as search_index
+from .page_cache import (author_scope, cached_page, group_scope, post_scope,
+                         POSTS, TRENDING_GROUPS, TRENDING_POSTS)
+from .replicas import replica_reads
+from .pagination import (comment_page, decode_token, encode_token, paginate,
+                         partial_requested, PER_PAGE)
 from .models import Post, Group, User, Follow
 from .forms import PostForm, CommentForm
 
 
-# @cache_page(20)
+@replica_reads
+@cached_page(lambda: [POSTS])
 def index(request):
-    post_list = Post.objects.order_by("-pub_date").all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.feed()
+    paginator, page = paginate(request, post_list)
+    if partial_requested(request):
+        return render(request, "feed_items.html", {"page": page})
     return render(request,
                   "index.html",
                   {"page": page, "paginator": paginator})
 
 
+@replica_reads
+@cached_page(lambda slug: [group_scope(slug), TRENDING_GROUPS])
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = Post.objects.filter(group=group).order_by("-pub_date").all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.feed().filter(group=group)
+    paginator, page = paginate(request, post_list)
+    if partial_requested(request):
+        return render(request, "feed_items.html", {"page": page})
     return render(request,
                   "group.html",
-                  {"group": group, "page": page, "paginator": paginator})
+                  {"group": group,
+                   "page": page,
+                   "paginator": paginator,
+                   "trending_groups": trending.top_groups()})
+
+
+@replica_reads
+# Просмотры меняют порядок без сброса областей: списки перечитываются
+# (trending.refresh) только при сборке страницы, поэтому страница живёт
+# не дольше TRENDING_REFRESH.
+@cached_page(lambda: [TRENDING_POSTS, TRENDING_GROUPS, POSTS],
+             lifetime=trending.refresh_interval)
+def trending_view(request):
+    return render(request,
+                  "trending.html",
+                  {"posts": trending.top_posts(),
+                   "trending_groups": trending.top_groups()})
+
+
+def search(request):
+    query = request.GET.get("q", "").strip()
+    group = request.GET.get("group") or None
+    author = request.GET.get("author") or None
+    after = decode_token(request.GET.get("after", ""), 2)
+    try:
+        after = (float(after[0]), int(after[1])) if after else None
+    except ValueError:
+        after = None
+    hits = search_index.get_backend().search(query,
+                                             group=group,
+                                             author=author,
+                                             after=after,
+                                             limit=PER_PAGE + 1)
+    posts = Post.objects.feed().in_bulk([post_id for post_id, _ in hits])
+    page = [posts[post_id] for post_id, _ in hits[:PER_PAGE]
+            if post_id in posts]
+    next_query = None
+    if len(hits) > PER_PAGE:
+        post_id, score = hits[PER_PAGE - 1]
+        params = request.GET.copy()
+        params["after"] = encode_token(score, post_id)
+        next_query = params.urlencode()
+    return render(request,
+                  "search.html",
+                  {"query": query,
+                   "group": group,
+                   "author": author,
+                   "page": page,
+                   "next_query": next_query})
 
 
 @login_required
 def new_post(request):
     if request.method == "POST":
-        form = PostForm(request.POST)
+        form = PostForm(request.POST, files=request.FILES or None)
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
@@ -43,38 +99,65 @@ def new_post(request):
     return render(request, "new_post.html", {"form": form, "edit": False})
 
 
+@replica_reads
+@cached_page(lambda username: [author_scope(username)], personal=True)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    post_list = Post.objects.filter(author=author.id).order_by("-pub_date").all()
-    followers = Follow.objects.filter(author=author).count()
-    following = Follow.objects.filter(user=author).count()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.feed().filter(author=author)
+    paginator, page = paginate(request, post_list)
+    if partial_requested(request):
+        return render(request, "feed_items.html", {"page": page})
+    stats = counters.user_stats(author)
+    is_following = (request.user.is_authenticated
+                    and follow_graph.follows(request.user.id, author.id))
     return render(request,
                   "profile.html",
                   {"author": author,
+                   "is_following": is_following,
+                   "who_to_follow": recommendations.for_user(request.user),
                    "page": page,
                    "post_list": post_list,
                    "paginator": paginator,
-                   "followers": followers,
-                   "following": following})
+                   "posts_count": stats.posts_count,
+                   "followers": stats.followers_count,
+                   "following": stats.following_count})
 
 
+@view_counts.count_views
+@replica_reads
+@cached_page(lambda username, post_id: [author_scope(username),
+                                         post_scope(post_id)])
 def post_view(request, username, post_id):
     # author = get_object_or_404(User, username=username)
     # post = Post.objects.get(id=post_id)
     post = get_object_or_404(Post, id=post_id, author__username=username)
-    count_post = Post.objects.filter(author=post.author).count()
+    stats = counters.user_stats(post.author)
     form = CommentForm(instance=None)
-    items = post.comments.all()
+    items = comment_page(post.comments.all(), request.GET.get("after"))
     return render(request,
                   "post.html",
                   {"author": post.author,
                    "post": post,
                    "form": form,
+                   "comments": items.object_list,
                    "items": items,
-                   "count_post": count_post})
+                   "count_post": stats.posts_count,
+                   "followers": stats.followers_count,
+                   "following": stats.following_count})
+
+
+@replica_reads
+@cached_page(lambda username, post_id: [author_scope(username),
+                                         post_scope(post_id)])
+def comments(request, username, post_id):
+    """Следующая страница комментариев поста фрагментом HTML."""
+    post = get_object_or_404(Post.objects.select_related("author"),
+                             id=post_id, author__username=username)
+    items = comment_page(post.comments.all(), request.GET.get("after"))
+    return render(request,
+                  "comment_list.html",
+                  {"post": post, "comments": items.object_list,
+                   "items": items})
 
 
 @login_required
@@ -87,7 +170,8 @@ def post_edit(request, username, post_id):
         form = PostForm(request.POST, files=request.FILES or None, instance=post)
         if form.is_valid():
             post = form.save(commit=False)
-            post.save()
+            # comment_count меняют только сигналы, не перезаписываем его
+            post.save(update_fields=[*PostForm.Meta.fields, "updated"])
             return redirect("post", username=author.username, post_id=post.id)
     form = PostForm(instance=post)
     return render(request,
@@ -107,26 +191,31 @@ def server_error(request):
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, id=post_id, author__username=username)
     form = CommentForm(request.POST or None)
-    items = post.comments.all()
     if form.is_valid():
         comment = form.save(commit=False)
         comment.post = post
         comment.author = request.user
         comment.save()
         return redirect('post', username=username, post_id=post_id)
-    return render(request, 'post.html', {'form': form, 'items': items, 'post': post})
+    items = comment_page(post.comments.all())
+    return render(request, 'post.html', {'form': form, 'items': items,
+                                         'comments': items.object_list,
+                                         'post': post})
 
 
+@replica_reads
 @login_required
 def follow_index(request):
     # информация о текущем пользователе доступна в переменной request.user
-    favorite_posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(favorite_posts, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    favorite_posts = feed.follow_feed(request.user)
+    paginator, page = paginate(request, favorite_posts)
+    if partial_requested(request):
+        return render(request, "feed_items.html", {"page": page})
     return render(request,
                   "follow.html",
-                  {"page": page, "paginator": paginator})
+                  {"page": page,
+                   "paginator": paginator,
+                   "who_to_follow": recommendations.for_user(request.user)})
 
 
 @login_required
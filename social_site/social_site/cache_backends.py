@@ -0,0 +1,261 @@
+"""Бэкенды кэша с подсчётом попаданий.
+
+``LocMemCache`` годится только для одного процесса: у каждого воркера
+gunicorn своя копия кэша, и сброс поколений страниц не доходит до
+соседей. Для нескольких процессов подключается ``FileBasedCache`` (один
+сервер) или ``RedisCache`` — минимальный клиент протокола Redis (RESP)
+без внешних зависимостей. Бэкенд выбирается переменной окружения
+``CACHE_BACKEND`` в ``settings.py``.
+
+Поколения ``page_cache`` сбрасываются через ``incr``. В Redis это одна
+атомарная команда, в ``LocMemCache`` — операция под блокировкой процесса,
+а у ``FileBasedCache`` ``incr`` — это чтение и запись файла: сбросы из
+разных процессов в один момент могут слиться в один, и страница,
+собранная между ними, проживёт до следующего сброса или таймаута.
+Там, где записи идут из нескольких воркеров одновременно, нужен Redis.
+"""
+import pickle
+import socket
+import threading
+from collections import Counter
+from urllib.parse import urlparse
+
+from django.core.cache.backends import filebased, locmem
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+from . import metrics
+
+
+stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def record(hits=0, misses=0):
+    with _stats_lock:
+        stats["hits"] += hits
+        stats["misses"] += misses
+    metrics.record_cache(hits, misses)
+
+
+def snapshot():
+    """Попадания и промахи текущего процесса."""
+    with _stats_lock:
+        hits, misses = stats["hits"], stats["misses"]
+    total = hits + misses
+    return {"hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else None}
+
+
+class StatsMixin:
+    def get(self, key, default=None, version=None):
+        sentinel = object()
+        value = super().get(key, sentinel, version=version)
+        if value is sentinel:
+            record(misses=1)
+            return default
+        record(hits=1)
+        return value
+
+
+class LocMemCache(StatsMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(StatsMixin, filebased.FileBasedCache):
+    """Кэш в файлах; ``incr`` между процессами не атомарен."""
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisConnection:
+    def __init__(self, host, port, db, timeout):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.file = self.sock.makefile("rb")
+        if db:
+            self.execute("SELECT", db)
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def execute(self, *args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self.sock.sendall(b"".join(parts))
+        return self.read_reply()
+
+    def read_reply(self):
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("Соединение с Redis закрыто")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            raise RedisError(body.decode())
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            size = int(body)
+            if size < 0:
+                return None
+            return self.file.read(size + 2)[:-2]
+        if kind == b"*":
+            size = int(body)
+            if size < 0:
+                return None
+            return [self.read_reply() for _ in range(size)]
+        raise RedisError(f"Неизвестный ответ: {line!r}")
+
+
+# INCRBY без EXISTS в одной команде создал бы вытесненный ключ заново.
+INCR_SCRIPT = """
+if redis.call("EXISTS", KEYS[1]) == 1 then
+    return redis.call("INCRBY", KEYS[1], ARGV[1])
+end
+return false
+"""
+
+
+class BaseRedisCache(BaseCache):
+    """Кэш поверх сервера с протоколом Redis.
+
+    ``LOCATION`` вида ``redis://host:port/db``. Целые числа хранятся как
+    есть, чтобы ``incr`` выполнялся атомарно на сервере, остальное —
+    через pickle.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        url = urlparse(server if "://" in server else f"redis://{server}")
+        self.host = url.hostname or "127.0.0.1"
+        self.port = url.port or 6379
+        self.db = int(url.path.lstrip("/") or 0)
+        self.socket_timeout = params.get("OPTIONS", {}).get("SOCKET_TIMEOUT",
+                                                            1.0)
+        self._local = threading.local()
+
+    def _execute(self, *args):
+        for attempt in (1, 2):
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = RedisConnection(self.host, self.port, self.db,
+                                       self.socket_timeout)
+                self._local.conn = conn
+            try:
+                return conn.execute(*args)
+            except (ConnectionError, OSError):
+                self.disconnect()
+                if attempt == 2:
+                    raise
+
+    def close(self, **kwargs):
+        # Django закрывает кэши после каждого запроса; соединение с
+        # сервером переиспользуется между запросами потока.
+        pass
+
+    def disconnect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expiry(self, timeout):
+        """Срок жизни в миллисекундах: ``None`` — бессрочно."""
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return max(int(timeout * 1000), 0)
+
+    @staticmethod
+    def _dumps(value):
+        if type(value) is int:
+            return str(value).encode()
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _loads(raw):
+        try:
+            return int(raw)
+        except ValueError:
+            return pickle.loads(raw)
+
+    def _set(self, key, value, timeout, *flags):
+        expiry = self._expiry(timeout)
+        if expiry == 0:
+            self._execute("DEL", key)
+            return False
+        args = ["SET", key, self._dumps(value), *flags]
+        if expiry is not None:
+            args += ["PX", expiry]
+        return self._execute(*args) == "OK"
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._set(self._key(key, version), value, timeout, "NX")
+
+    def get(self, key, default=None, version=None):
+        raw = self._execute("GET", self._key(key, version))
+        return default if raw is None else self._loads(raw)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set(self._key(key, version), value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            return bool(self._execute("PERSIST", key)
+                        or self._execute("EXISTS", key))
+        return bool(self._execute("PEXPIRE", key, expiry))
+
+    def delete(self, key, version=None):
+        return bool(self._execute("DEL", self._key(key, version)))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        raw = self._execute("MGET", *[self._key(key, version) for key in keys])
+        return {key: self._loads(value)
+                for key, value in zip(keys, raw) if value is not None}
+
+    def has_key(self, key, version=None):
+        return bool(self._execute("EXISTS", self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        try:
+            value = self._execute("EVAL", INCR_SCRIPT, 1, key, delta)
+        except RedisError:
+            raise ValueError(f"Key '{key}' is not an integer")
+        if value is None:
+            raise ValueError(f"Key '{key}' not found")
+        return value
+
+    def clear(self):
+        self._execute("FLUSHDB")
+
+    def info(self):
+        raw = self._execute("INFO").decode()
+        return dict(line.split(":", 1) for line in raw.splitlines()
+                    if ":" in line and not line.startswith("#"))
+
+
+class RedisCache(StatsMixin, BaseRedisCache):
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version=version)
+        record(hits=len(found), misses=len(keys) - len(found))
+        return found
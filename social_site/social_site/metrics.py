@@ -0,0 +1,281 @@
+"""Метрики запросов по именам маршрутов.
+
+``MetricsMiddleware`` (синхронный и асинхронный) для каждого запроса
+замеряет полное время ответа, число и время SQL запросов (обёрткой из
+``connection.execute_wrappers`` на соединениях всех потоков), время
+рендеринга шаблонов (через бэкенд шаблонов ``DjangoTemplates`` из этого
+модуля) и попадания в кэш (их сообщает ``cache_backends.record``).
+Данные копятся в памяти процесса по имени маршрута (``index``,
+``profile``, ``post``, ...) и отдаются персоналу представлениями
+``metrics`` (JSON) и ``metrics_prometheus`` (текстовый формат Prometheus).
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from collections import Counter
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends import django as django_backend
+
+
+# Верхние границы корзин гистограммы задержки, миллисекунды.
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+UNRESOLVED = "<unresolved>"
+
+_routes = {}
+_lock = threading.Lock()
+# Контекстная переменная, а не threading.local: под ASGI запрос идёт в
+# цикле событий, а его SQL и шаблоны — в потоках sync_to_async, куда
+# asgiref копирует контекст.
+_current = contextvars.ContextVar("metrics_collector", default=None)
+
+
+class Collector:
+    """Счётчики одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_ms += (time.perf_counter() - started) * 1000
+
+
+class RouteStats:
+    def __init__(self):
+        self.requests = 0
+        self.statuses = Counter()
+        self.buckets = [0] * len(BUCKETS)
+        self.latency_ms = 0.0
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def add(self, status, elapsed_ms, collector):
+        self.requests += 1
+        self.statuses[status] += 1
+        self.latency_ms += elapsed_ms
+        for index, bound in enumerate(BUCKETS):
+            if elapsed_ms <= bound:
+                self.buckets[index] += 1
+                break
+        self.queries += collector.queries
+        self.db_ms += collector.db_ms
+        self.template_ms += collector.template_ms
+        self.cache_hits += collector.cache_hits
+        self.cache_misses += collector.cache_misses
+
+    def quantile(self, share):
+        """Верхняя граница корзины, в которую попадает перцентиль."""
+        target = share * self.requests
+        seen = 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if seen >= target:
+                return bound if bound != float("inf") else None
+        return None
+
+    def as_dict(self):
+        requests = self.requests or 1
+        return {
+            "requests": self.requests,
+            "statuses": {str(status): count
+                         for status, count in sorted(self.statuses.items())},
+            "latency_ms": {
+                "mean": round(self.latency_ms / requests, 3),
+                "p50": self.quantile(0.50),
+                "p95": self.quantile(0.95),
+                "p99": self.quantile(0.99),
+                "buckets": {_le(bound): count
+                            for bound, count in zip(BUCKETS, self.buckets)},
+            },
+            "db": {
+                "queries": self.queries,
+                "queries_per_request": round(self.queries / requests, 2),
+                "time_ms": round(self.db_ms, 3),
+            },
+            "template_ms": round(self.template_ms, 3),
+            "cache": {"hits": self.cache_hits, "misses": self.cache_misses},
+        }
+
+
+def _le(bound):
+    return "+Inf" if bound == float("inf") else str(bound)
+
+
+def current():
+    """Счётчики текущего запроса или ``None`` вне запроса."""
+    return _current.get()
+
+
+def _execute(execute, sql, params, many, context):
+    collector = current()
+    if collector is None:
+        return execute(sql, params, many, context)
+    return collector(execute, sql, params, many, context)
+
+
+def install(connection, **kwargs):
+    """Подключает подсчёт SQL к соединению любого потока.
+
+    Обёртка ставится первой в ``execute_wrappers``, чтобы не мешать
+    временным обёрткам ``connection.execute_wrapper()``.
+    """
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _execute)
+
+
+connection_created.connect(install)
+
+
+def record_cache(hits=0, misses=0):
+    collector = current()
+    if collector is not None:
+        collector.cache_hits += hits
+        collector.cache_misses += misses
+
+
+def snapshot():
+    with _lock:
+        return {route: stats.as_dict()
+                for route, stats in sorted(_routes.items())}
+
+
+def reset():
+    with _lock:
+        _routes.clear()
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        for connection in connections.all():
+            install(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        collector, started = Collector(), time.perf_counter()
+        token = _current.set(collector)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, started, collector)
+        return response
+
+    async def __acall__(self, request):
+        collector, started = Collector(), time.perf_counter()
+        token = _current.set(collector)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, started, collector)
+        return response
+
+    @staticmethod
+    def _record(request, response, started, collector):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        match = request.resolver_match
+        route = (match.url_name if match and match.url_name
+                 else UNRESOLVED)
+        with _lock:
+            stats = _routes.get(route)
+            if stats is None:
+                stats = _routes[route] = RouteStats()
+            stats.add(response.status_code, elapsed_ms, collector)
+
+
+class Template:
+    """Шаблон, время рендеринга которого попадает в метрики запроса."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        collector = current()
+        if collector is None:
+            return self.template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            collector.template_ms += (time.perf_counter() - started) * 1000
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name))
+
+
+METRICS = (
+    ("requests_total", "counter", "Ответы по маршруту и статусу"),
+    ("request_duration_seconds", "histogram", "Время ответа"),
+    ("db_queries_total", "counter", "SQL запросы"),
+    ("db_query_seconds_total", "counter", "Время SQL запросов"),
+    ("template_render_seconds_total", "counter", "Время рендеринга шаблонов"),
+    ("cache_hits_total", "counter", "Попадания в кэш"),
+    ("cache_misses_total", "counter", "Промахи кэша"),
+)
+
+
+def prometheus():
+    """Метрики процесса в текстовом формате Prometheus."""
+    with _lock:
+        routes = sorted(_routes.items())
+        samples = {name: [] for name, _, _ in METRICS}
+        for route, stats in routes:
+            label = f'view="{route}"'
+            for status, count in sorted(stats.statuses.items()):
+                samples["requests_total"].append(
+                    (f'{{{label},status="{status}"}}', count))
+            seen = 0
+            for bound, count in zip(BUCKETS, stats.buckets):
+                seen += count
+                le = "+Inf" if bound == float("inf") else bound / 1000
+                samples["request_duration_seconds"].append(
+                    (f'_bucket{{{label},le="{le}"}}', seen))
+            samples["request_duration_seconds"] += [
+                (f"_sum{{{label}}}", stats.latency_ms / 1000),
+                (f"_count{{{label}}}", stats.requests),
+            ]
+            for name, value in (
+                ("db_queries_total", stats.queries),
+                ("db_query_seconds_total", stats.db_ms / 1000),
+                ("template_render_seconds_total", stats.template_ms / 1000),
+                ("cache_hits_total", stats.cache_hits),
+                ("cache_misses_total", stats.cache_misses),
+            ):
+                samples[name].append((f"{{{label}}}", value))
+    lines = []
+    for name, kind, help_text in METRICS:
+        lines += [f"# HELP django_{name} {help_text}",
+                  f"# TYPE django_{name} {kind}"]
+        lines += [f"django_{name}{suffix} {value}"
+                  for suffix, value in samples[name]]
+    return "\n".join(lines) + "\n"
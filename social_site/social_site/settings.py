@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -36,10 +37,8 @@ ALLOWED_HOSTS = [
 # Application definition
 
 INSTALLED_APPS = [
-    'users',
-    'posts',
-    'sorl.thumbnail',
-    'debug_toolbar',
+    'users.apps.UsersConfig',
+    'posts.apps.PostsConfig',
     'django.contrib.sites',
     'django.contrib.flatpages',
     'django.contrib.admin',
@@ -51,22 +50,30 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'social_site.metrics.MetricsMiddleware',
+    'posts.replicas.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# debug_toolbar нужен только при разработке.
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 ROOT_URLCONF = 'social_site.urls'
 
 TEMPLATES_DIR = Path(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, замеряющий время рендеринга для метрик.
+        'BACKEND': 'social_site.metrics.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -86,13 +93,44 @@ WSGI_APPLICATION = 'social_site.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
+# PRAGMA, которые social_site.sqlite выполняет на каждом новом соединении.
+# WAL позволяет читать во время записи комментариев и постов, а
+# busy_timeout заставляет писателя подождать блокировку вместо ошибки
+# "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,  # в КиБ
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'social_site.sqlite',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {'pragmas': SQLITE_PRAGMAS},
+        # Соединение живёт между запросами вместо переподключения на
+        # каждый запрос; 0 возвращает старое поведение.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
     }
 }
 
+# Реплики для чтения лент: пути к копиям базы через запятую в DB_REPLICAS,
+# их наполняет внешняя репликация (например, Litestream или LiteFS).
+# Записи и чтения остальных вьюх идут в default; после записи браузер
+# REPLICA_PIN_SECONDS секунд читает из default (см. posts/replicas.py).
+DATABASE_REPLICAS = []
+for index, path in enumerate(
+        filter(None, os.environ.get('DB_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], 'NAME': path}
+    DATABASE_REPLICAS.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['posts.replicas.ReplicaRouter']
+
+REPLICA_PIN_SECONDS = 15
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -141,16 +179,113 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = Path(BASE_DIR, 'media')
 
 
+# Сессии пишутся в кэш и в базу, читаются из кэша; пользователь сессии
+# тоже берётся из кэша. С CACHE_BACKEND=locmem выход и смена пароля в
+# одном воркере не видны остальным: для нескольких процессов нужен общий
+# кэш (file или redis), как и для кэша страниц.
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+# Новые входы идут через первый бэкенд. ModelBackend остаётся в списке
+# для сессий, созданных до кэша: без него auth.get_user отверг бы их путь
+# бэкенда и разлогинил всех при выкладке. Такие сессии читают
+# пользователя из базы, пока он не войдёт заново.
+AUTHENTICATION_BACKENDS = [
+    "users.backends.CachedModelBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+USER_CACHE_TIMEOUT = 60 * 15
+
 LOGIN_URL = "/auth/login/"
 LOGIN_REDIRECT_URL = "index"
 # LOGOUT_REDIRECT_URL = "index"
 
 
+# Кэш выбирается переменной окружения CACHE_BACKEND:
+#   locmem - память процесса, только для одного воркера (по умолчанию);
+#   file   - каталог CACHE_LOCATION, общий для воркеров на одном сервере;
+#   redis  - сервер с протоколом Redis по адресу CACHE_LOCATION,
+#            общий для любого числа процессов и серверов.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'social_site.cache_backends.LocMemCache',
+    },
+    'file': {
+        'BACKEND': 'social_site.cache_backends.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', BASE_DIR / 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    'redis': {
+        'BACKEND': 'social_site.cache_backends.RedisCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION',
+                                   'redis://127.0.0.1:6379/0'),
+    },
+}
+
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    'default': CACHE_BACKENDS[CACHE_BACKEND],
 }
 
 
 SITE_ID = 1
+
+
+# Авторы, у которых подписчиков больше этого числа, не раскладывают посты
+# по лентам подписчиков при публикации: их посты подмешиваются при чтении.
+FEED_FANOUT_MAX_FOLLOWERS = 1000
+# Обратно к раскладке автор возвращается, только опустившись до
+# FEED_FANOUT_MIN_FOLLOWERS, и только после `rebuild_feed --backfill`:
+# её стоит запускать по расписанию (cron), пока она не выполнена, посты
+# автора по-прежнему подмешиваются при чтении.
+FEED_FANOUT_MIN_FOLLOWERS = 800
+
+# Сколько секунд граф подписок (posts.follow_graph) хранится в кэше.
+FOLLOW_GRAPH_TIMEOUT = 60 * 60
+
+# Рекомендации «на кого подписаться»: сколько авторов хранит для
+# пользователя команда rebuild_recommendations и сколько видно в панели.
+RECOMMENDATIONS_TOP_K = 20
+RECOMMENDATIONS_PANEL_SIZE = 5
+
+# Популярное (/trending/): оценка затухает вдвое за TRENDING_HALF_LIFE
+# секунд, в оценку идёт доля TRENDING_VIEW_SAMPLE_RATE просмотров, списки
+# из TRENDING_SIZE элементов обновляются раз в TRENDING_REFRESH секунд,
+# страница /trending/ в кэше страниц живёт столько же. Выборочные
+# просмотры пишутся вместе с буфером VIEW_COUNTS_*.
+TRENDING_HALF_LIFE = 60 * 60 * 6
+TRENDING_VIEW_SAMPLE_RATE = 0.1
+TRENDING_SIZE = 10
+TRENDING_REFRESH = 60
+
+# Просмотры постов копятся в памяти процесса и пишутся в базу раз в
+# VIEW_COUNTS_FLUSH_SECONDS секунд или каждые VIEW_COUNTS_FLUSH_EVENTS
+# просмотров. Срок проверяется только при очередном просмотре, поэтому
+# при падении процесса теряется не больше VIEW_COUNTS_FLUSH_EVENTS
+# просмотров; 0 — писать каждый просмотр сразу.
+VIEW_COUNTS_FLUSH_SECONDS = 10
+VIEW_COUNTS_FLUSH_EVENTS = 100
+
+# Курсорная пагинация (?after= / ?before=) для лент по умолчанию.
+# Ссылки вида ?page=N продолжают работать в любом режиме.
+FEED_CURSOR_PAGINATION = False
+
+# Время жизни страниц в кэше для анонимных пользователей, секунды.
+# Страницы сбрасываются сигналами при изменении данных; 0 отключает кэш.
+PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Потоки фоновой генерации миниатюр в каждом процессе; 0 - синхронно.
+THUMBNAIL_WORKERS = 2
+
+# Бэкенд полнотекстового поиска (/search/): FTS5 для SQLite или
+# posts.search.LikeSearchBackend для СУБД без своего бэкенда.
+SEARCH_BACKEND = 'posts.search.SqliteFTSBackend'
+
+# Токен для сбора метрик Prometheus с /admin/metrics/prometheus/
+# (заголовок "Authorization: Bearer <токен>"); без него - только персонал.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Маршруты, которые обслуживают асинхронные версии вьюх из
+# posts/async_views.py (index, group_posts, profile, post_view,
+# follow_index), через запятую. Имеет смысл только под ASGI.
+ASYNC_VIEWS = [name for name in os.environ.get('ASYNC_VIEWS', '').split(',')
+               if name]
@@ -0,0 +1,21 @@
+"""Бэкенд SQLite, который настраивает каждое новое соединение.
+
+Это обычный ``django.db.backends.sqlite3`` с дополнительным ключом
+``OPTIONS["pragmas"]``: словарь ``PRAGMA``, которые выполняются сразу
+после подключения, до первого запроса. Значения по умолчанию заданы в
+``settings.SQLITE_PRAGMAS``.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop("pragmas", {})
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
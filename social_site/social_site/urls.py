@@ -5,12 +5,19 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.conf.urls import handler404, handler500
 
+from .views import cache_stats, metrics_json, metrics_prometheus
+
 
 handler404 = 'posts.views.page_not_found' # noqa
 handler500 = 'posts.views.server_error' # noqa
 
 
 urlpatterns = [
+    path('admin/cache-stats/', cache_stats, name='cache_stats'),
+    path('admin/metrics/', metrics_json, name='metrics'),
+    path('admin/metrics/prometheus/',
+         metrics_prometheus,
+         name='metrics_prometheus'),
     path('admin/', admin.site.urls),
     path('about/', include('django.contrib.flatpages.urls')),
     path('', include('posts.urls')),
@@ -0,0 +1,60 @@
+import hmac
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+
+from . import cache_backends, metrics
+
+
+SERVER_INFO_FIELDS = ("keyspace_hits", "keyspace_misses", "used_memory",
+                      "connected_clients")
+
+
+@staff_member_required
+def cache_stats(request):
+    """Состояние кэша: проба записи/чтения и доля попаданий процесса."""
+    key = f"health:{uuid.uuid4().hex}"
+    started = time.perf_counter()
+    try:
+        cache.set(key, key, 10)
+        healthy = cache.get(key) == key
+        cache.delete(key)
+        error = None
+    except Exception as e:
+        healthy, error = False, str(e)
+    data = {
+        "backend": settings.CACHES["default"]["BACKEND"],
+        "healthy": healthy,
+        "error": error,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+        "process": cache_backends.snapshot(),
+    }
+    if healthy and hasattr(cache, "info"):
+        info = cache.info()
+        data["server"] = {field: info.get(field)
+                          for field in SERVER_INFO_FIELDS}
+    return JsonResponse(data)
+
+
+@staff_member_required
+def metrics_json(request):
+    """Метрики запросов процесса по именам маршрутов."""
+    return JsonResponse({"routes": metrics.snapshot(),
+                         "cache": cache_backends.snapshot()})
+
+
+def metrics_prometheus(request):
+    """Те же метрики для Prometheus: персоналу или по ``METRICS_TOKEN``."""
+    token = getattr(settings, "METRICS_TOKEN", None)
+    authorized = request.user.is_active and request.user.is_staff
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    if token and hmac.compare_digest(header, f"Bearer {token}"):
+        authorized = True
+    if not authorized:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.prometheus(),
+                        content_type="text/plain; version=0.0.4")
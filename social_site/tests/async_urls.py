@@ -0,0 +1,14 @@
+from django.urls import path
+
+from posts import async_views
+from social_site.urls import urlpatterns as site_urlpatterns
+
+urlpatterns = [
+    path('', async_views.index, name='index'),
+    path('follow/', async_views.follow_index, name='follow_index'),
+    path('group/<slug:slug>', async_views.group_posts, name='groups'),
+    path('<str:username>/', async_views.profile, name='profile'),
+    path('<str:username>/<int:post_id>/', async_views.post_view, name='post'),
+    path('<str:username>/<int:post_id>/comments/', async_views.comments,
+         name='comments'),
+] + site_urlpatterns
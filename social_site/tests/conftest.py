@@ -1,4 +1,40 @@
+import pytest
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
+    'tests.fixtures.fixture_queries',
+    'tests.fixtures.fixture_redis',
+    'tests.fixtures.fixture_replica',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    # Загруженные в тестах картинки и их варианты не попадают в MEDIA_ROOT.
+    # Варианты строятся синхронно, иначе пул допишет их после теста, когда
+    # настройка уже вернётся.
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    settings.THUMBNAIL_WORKERS = 0
+
+
+@pytest.fixture(autouse=True)
+def no_view_sampling(settings):
+    # Просмотры для популярного выбираются случайно; тесты включают их явно.
+    settings.TRENDING_VIEW_SAMPLE_RATE = 0
+
+
+@pytest.fixture(autouse=True)
+def reset_view_counts():
+    from posts import view_counts
+    view_counts.reset()
+    yield
+    view_counts.reset()
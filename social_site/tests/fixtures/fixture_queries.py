@@ -0,0 +1,16 @@
+import pytest
+
+
+@pytest.fixture
+def assert_page_queries(django_assert_max_num_queries):
+    """Проверяет, что страница укладывается в бюджет SQL-запросов.
+
+    Бюджет не должен зависеть от числа постов на странице: так ловятся
+    ленивые обращения к связанным объектам в шаблонах (N+1).
+    """
+    def check(client, url, budget):
+        with django_assert_max_num_queries(budget):
+            response = client.get(url)
+        assert response.status_code == 200, f'Страница `{url}` недоступна'
+        return response
+    return check
@@ -0,0 +1,148 @@
+import socketserver
+import threading
+import time
+
+import pytest
+
+from social_site.cache_backends import INCR_SCRIPT
+
+
+class StandInStore:
+    """Подмножество команд Redis, которого хватает ``RedisCache``."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+        self.expires = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _alive(self, key):
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def _get(self, key):
+        if self._alive(key):
+            self.hits += 1
+            return self.data[key]
+        self.misses += 1
+        return None
+
+    def execute(self, command, *args):
+        with self.lock:
+            return getattr(self, f"cmd_{command.decode().lower()}")(*args)
+
+    def cmd_ping(self):
+        return "PONG"
+
+    def cmd_select(self, db):
+        return "OK"
+
+    def cmd_get(self, key):
+        return self._get(key)
+
+    def cmd_mget(self, *keys):
+        return [self._get(key) for key in keys]
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        if b"NX" in options and self._alive(key):
+            return None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        if b"PX" in options:
+            millis = int(options[options.index(b"PX") + 1])
+            self.expires[key] = time.time() + millis / 1000
+        return "OK"
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                del self.data[key]
+                self.expires.pop(key, None)
+                removed += 1
+        return removed
+
+    def cmd_exists(self, *keys):
+        return sum(self._alive(key) for key in keys)
+
+    def cmd_eval(self, script, numkeys, *args):
+        # Из скриптов нужен только атомарный incr существующего ключа.
+        if script.decode() != INCR_SCRIPT or int(numkeys) != 1:
+            raise ValueError('unknown script')
+        key, delta = args
+        if not self._alive(key):
+            return None
+        return self.cmd_incrby(key, delta)
+
+    def cmd_incrby(self, key, delta):
+        value = int(self.data.get(key, b"0")) + int(delta)
+        self.data[key] = str(value).encode()
+        return value
+
+    def cmd_pexpire(self, key, millis):
+        if not self._alive(key):
+            return 0
+        self.expires[key] = time.time() + int(millis) / 1000
+        return 1
+
+    def cmd_persist(self, key):
+        return int(self.expires.pop(key, None) is not None)
+
+    def cmd_flushdb(self):
+        self.data.clear()
+        self.expires.clear()
+        return "OK"
+
+    def cmd_info(self):
+        return (f"# Stats\r\nkeyspace_hits:{self.hits}\r\n"
+                f"keyspace_misses:{self.misses}\r\n").encode()
+
+
+def encode_reply(value):
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, str):
+        return f"+{value}\r\n".encode()
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    if isinstance(value, Exception):
+        return f"-ERR {value}\r\n".encode()
+    return b"*%d\r\n" % len(value) + b"".join(map(encode_reply, value))
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            header = self.rfile.readline()
+            if not header:
+                return
+            args = []
+            for _ in range(int(header[1:])):
+                size = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(size + 2)[:-2])
+            try:
+                reply = self.server.store.execute(*args)
+            except (AttributeError, ValueError) as e:
+                reply = e
+            self.wfile.write(encode_reply(reply))
+
+
+@pytest.fixture
+def redis_server():
+    """Локальный сервер с протоколом Redis вместо настоящего Redis."""
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), RespHandler)
+    server.daemon_threads = True
+    server.store = StandInStore()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    yield f"redis://{host}:{port}/0"
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,30 @@
+import pytest
+from django.db import connections
+
+
+class ReplicaHarness:
+    """Реплика в отдельном файле SQLite, которую тест догоняет вручную."""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def sync(self):
+        """Копирует основную базу в реплику целиком."""
+        primary, replica = connections['default'], connections[self.alias]
+        primary.ensure_connection()
+        replica.ensure_connection()
+        primary.connection.backup(replica.connection)
+
+
+@pytest.fixture
+def replica(settings, tmp_path):
+    alias = 'replica'
+    connections.databases[alias] = {**connections['default'].settings_dict,
+                                    'NAME': str(tmp_path / 'replica.sqlite3')}
+    settings.DATABASE_REPLICAS = [alias]
+    harness = ReplicaHarness(alias)
+    harness.sync()
+    yield harness
+    connections[alias].close()
+    del connections[alias]
+    del connections.databases[alias]
@@ -0,0 +1,80 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts import admin as admin_module
+from posts.admin import COUNT_LIMIT, EstimatedCountPaginator
+from posts.models import Comment, Post
+
+
+@pytest.fixture
+def many_posts(user, group):
+    return [Post.objects.create(text=f'Пост номер {i}', author=user,
+                                group=group if i % 2 else None)
+            for i in range(20)]
+
+
+def changelist(admin_client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = admin_client.get(url)
+    assert response.status_code == 200, f'Страница `{url}` недоступна'
+    return response, [query['sql'] for query in context.captured_queries]
+
+
+class TestAdmin:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_changelist_queries(self, admin_client, many_posts):
+        admin_client.get('/admin/posts/post/')
+        _, small = changelist(admin_client, '/admin/posts/post/?q=')
+        for post in many_posts[:3]:
+            Comment.objects.create(post=post, author=post.author, text='Текст')
+        Post.objects.bulk_create(Post(text='Ещё пост', author=many_posts[0].author)
+                                 for _ in range(20))
+        _, large = changelist(admin_client, '/admin/posts/post/?q=')
+        assert len(large) == len(small), \
+            'Проверьте `list_select_related`: число запросов не должно расти'
+        assert not any(sql.startswith('SELECT COUNT(*)') for sql in large), \
+            'Проверьте, что список постов не выполняет полный COUNT(*)'
+        changelist(admin_client, '/admin/posts/comment/')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_uses_index(self, admin_client, many_posts):
+        Comment.objects.create(post=many_posts[0], author=many_posts[0].author,
+                               text='Отличный комментарий')
+        response, queries = changelist(admin_client, '/admin/posts/post/?q=номер 7')
+        assert [p.text for p in response.context['cl'].result_list] == \
+            ['Пост номер 7'], 'Проверьте поиск постов в админке'
+        assert not any('LIKE' in sql for sql in queries), \
+            'Поиск в админке должен идти через индекс, а не LIKE'
+
+        response, _ = changelist(admin_client, '/admin/posts/post/?q=отличный')
+        assert list(response.context['cl'].result_list) == [], \
+            'Поиск постов в админке не должен искать по комментариям'
+
+        response, _ = changelist(admin_client, '/admin/posts/comment/?q=отличн')
+        assert [c.text for c in response.context['cl'].result_list] == \
+            ['Отличный комментарий'], 'Проверьте поиск комментариев в админке'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_truncation_warning(self, admin_client, many_posts, monkeypatch):
+        monkeypatch.setattr(admin_module, 'SEARCH_LIMIT', 5)
+        response = admin_client.get('/admin/posts/post/?q=пост')
+        assert len(response.context['cl'].result_list) == 5
+        assert any('5 лучших совпадений' in str(message)
+                   for message in response.context['messages']), \
+            'Проверьте, что админка сообщает об обрезанной выдаче поиска'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_estimated_count(self, many_posts):
+        assert EstimatedCountPaginator(Post.objects.all(), 10).count == \
+            many_posts[-1].id, 'Без статистики оценка берётся из максимального id'
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Post.objects.filter(pk=many_posts[0].pk).delete()
+        assert EstimatedCountPaginator(Post.objects.all(), 10).count == 20, \
+            'Проверьте, что оценка берётся из статистики ANALYZE'
+        assert EstimatedCountPaginator(Post.objects.filter(group=None), 10).count == 9, \
+            'С фильтром число строк считается точно'
+        assert EstimatedCountPaginator(Post.objects.filter(pk__gt=0), 5).count \
+            <= COUNT_LIMIT
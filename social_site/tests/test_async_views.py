@@ -0,0 +1,72 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+
+from posts import async_views, urls, views
+from posts.models import Comment, Follow, Post
+
+
+def async_get(client, url):
+    async def get():
+        return await client.get(url)
+    return async_to_sync(get)()
+
+
+@pytest.fixture
+def async_client():
+    return AsyncClient()
+
+
+@pytest.mark.urls('tests.async_urls')
+class TestAsyncViews:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pages_match_sync_views(self, client, async_client, post_with_group, settings):
+        settings.PAGE_CACHE_TIMEOUT = 0
+        post = post_with_group
+        Comment.objects.create(post=post, author=post.author, text='Комментарий')
+        for url in ('/', f'/group/{post.group.slug}', f'/{post.author.username}/',
+                    '/?after=&partial=1'):
+            response = async_get(async_client, url)
+            assert response.status_code == 200, f'Страница `{url}` не найдена'
+            assert post.text in response.content.decode()
+            assert response.content == client.get(url).content, \
+                f'Проверьте, что асинхронная вьюха `{url}` отдаёт ту же страницу'
+
+        response = async_get(async_client, f'/{post.author.username}/{post.id}/')
+        assert response.status_code == 200
+        assert 'Комментарий' in response.content.decode()
+        url = f'/{post.author.username}/{post.id}/comments/'
+        assert async_get(async_client, url).content == client.get(url).content, \
+            'Проверьте асинхронную вьюху фрагмента комментариев'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_not_found(self, async_client, post, group):
+        assert async_get(async_client, '/group/missing').status_code == 404
+        assert async_get(async_client, '/missing/').status_code == 404
+        assert async_get(async_client, f'/missing/{post.id}/').status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_index(self, async_client, user, django_user_model):
+        assert async_get(async_client, '/follow/').status_code == 302, \
+            'Проверьте, что лента подписок требует входа'
+        author = django_user_model.objects.create_user(username='Author')
+        Post.objects.create(text='Пост автора', author=author)
+        Follow.objects.create(user=user, author=author)
+        async_client.force_login(user)
+        response = async_get(async_client, '/follow/')
+        assert response.status_code == 200
+        assert 'Пост автора' in response.content.decode()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_page_cache(self, async_client, post):
+        assert post.text in async_get(async_client, '/').content.decode()
+        Post.objects.filter(pk=post.pk).update(text='Изменено без сигналов')
+        assert post.text in async_get(async_client, '/').content.decode(), \
+            'Проверьте, что асинхронные вьюхи используют кэш страниц'
+
+
+def test_view_selection(settings):
+    settings.ASYNC_VIEWS = ['profile']
+    assert urls.view('profile') is async_views.profile
+    assert urls.view('index') is views.index
@@ -0,0 +1,63 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users import backends
+
+
+def auth_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, f'Страница `{url}` недоступна'
+    return [query['sql'] for query in context.captured_queries
+            if 'FROM "django_session"' in query['sql']
+            or 'FROM "auth_user"' in query['sql']]
+
+
+class TestAuthCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_warm_request_skips_session_and_user(self, user_client):
+        auth_queries(user_client, '/follow/')
+        assert auth_queries(user_client, '/follow/') == [], \
+            'Сессия и пользователь должны читаться из кэша'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_user_save_invalidates(self, user_client, user):
+        user_client.get('/follow/')
+        user.first_name = 'Новое имя'
+        user.save()
+        response = user_client.get('/follow/')
+        assert response.wsgi_request.user.first_name == 'Новое имя', \
+            'Проверьте, что сохранение пользователя сбрасывает кэш'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_password_change_ends_sessions(self, user_client, user):
+        user_client.get('/follow/')
+        user.set_password('new-password')
+        user.save()
+        response = user_client.get('/follow/')
+        assert response.status_code == 302, \
+            'После смены пароля старая сессия не должна работать'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_logout_forgets_user(self, user_client, user):
+        from django.core.cache import cache
+        user_client.get('/follow/')
+        assert cache.get(backends.cache_key(user.pk)) is not None
+        user_client.get('/auth/logout/')
+        assert cache.get(backends.cache_key(user.pk)) is None
+        assert user_client.get('/follow/').status_code == 302
+
+    @pytest.mark.django_db(transaction=True)
+    def test_inactive_user(self, user_client, user, django_user_model):
+        user_client.get('/follow/')
+        django_user_model.objects.filter(pk=user.pk).update(is_active=False)
+        backends.forget(user.pk)
+        assert user_client.get('/follow/').status_code == 302
+
+    @pytest.mark.django_db(transaction=True)
+    def test_sessions_from_model_backend(self, client, user):
+        client.force_login(user, backend='django.contrib.auth.backends.ModelBackend')
+        assert client.get('/follow/').status_code == 200, \
+            'Сессии, созданные до кэша пользователей, не должны разлогиниваться'
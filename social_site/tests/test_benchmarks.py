@@ -0,0 +1,59 @@
+import random
+
+import pytest
+from django.core.management import call_command
+
+from benchmarks import load, seed
+from posts.models import Follow, Post
+
+
+@pytest.fixture
+def manifest(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return seed.seed(users=30, groups=3, posts=200, comments=300,
+                     following=4, images=1, rng=random.Random(1))
+
+
+class TestLoadBenchmark:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_seed_is_deterministic(self, manifest):
+        posts = list(Post.objects.order_by('id').values_list(
+            'author_id', 'group_id', 'image'))
+        follows = list(Follow.objects.order_by('id').values_list(
+            'user_id', 'author_id'))
+        call_command('flush', interactive=False)
+
+        again = seed.seed(users=30, groups=3, posts=200, comments=300,
+                          following=4, images=1, rng=random.Random(1))
+        assert again['posts'] == manifest['posts'], \
+            'Проверьте, что наполнение повторяется при том же seed'
+        assert list(Post.objects.order_by('id').values_list(
+            'author_id', 'group_id', 'image')) == posts
+        assert list(Follow.objects.order_by('id').values_list(
+            'user_id', 'author_id')) == follows
+
+    @pytest.mark.django_db(transaction=True)
+    def test_drive_all_views_in_process(self, manifest):
+        transport = load.WSGITransport()
+        anonymous = load.Client(transport)
+        authenticated = load.Client(transport)
+        authenticated.login(manifest['users'][0], manifest['password'])
+
+        samples = load.drive(anonymous, authenticated, manifest,
+                             list(load.SCENARIOS), random.Random(1),
+                             requests=60)
+        assert {name for name, _, _, _ in samples} == set(load.SCENARIOS)
+        summary = load.summarize(samples, elapsed=1.0)
+        assert summary['requests'] == 60
+        assert summary['errors'] == 0, \
+            'Проверьте, что драйвер строит рабочие адреса всех представлений'
+        assert summary['queries_per_request'] > 0, \
+            'Проверьте, что драйвер считает SQL запросы'
+        assert summary['p50_ms'] <= summary['p95_ms'] <= summary['p99_ms']
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert load.percentile(values, 0.5) == 50
+        assert load.percentile(values, 0.99) == 99
+        assert load.percentile([], 0.5) is None
@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from posts.models import Post
+from social_site.cache_backends import RedisCache
+
+
+def redis_caches(location):
+    return {'default': {'BACKEND': 'social_site.cache_backends.RedisCache',
+                        'LOCATION': location}}
+
+
+class TestRedisCache:
+
+    def test_cache_api(self, redis_server):
+        cache = RedisCache(redis_server, {})
+        cache.set('number', 1)
+        cache.set('object', {'a': [1, 2]})
+        assert cache.get('number') == 1
+        assert cache.get('object') == {'a': [1, 2]}
+        assert cache.get('missing', 'default') == 'default'
+        assert cache.incr('number', 5) == 6
+        with pytest.raises(ValueError):
+            cache.incr('missing')
+        assert not cache.add('number', 10)
+        assert cache.add('new', 10)
+        assert cache.get_many(['number', 'new', 'missing']) == {'number': 6, 'new': 10}
+        assert cache.delete('new') and not cache.has_key('new')
+
+        cache.set('short', 'value', 0.05)
+        time.sleep(0.1)
+        assert cache.get('short') is None, 'Проверьте, что ключи истекают по таймауту'
+        cache.clear()
+        assert cache.get('number') is None
+
+    def test_concurrent_incr(self, redis_server):
+        cache = RedisCache(redis_server, {})
+        cache.set('gen:posts', 0, None)
+        cache.set('text', 'строка')
+
+        def bump():
+            for _ in range(50):
+                cache.incr('gen:posts')
+
+        threads = [threading.Thread(target=bump) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert cache.get('gen:posts') == 200, \
+            'Проверьте, что `incr` атомарен и сбросы поколений не теряются'
+        with pytest.raises(ValueError):
+            cache.incr('text')
+
+    def test_processes_share_cache(self, redis_server):
+        worker_1 = RedisCache(redis_server, {})
+        worker_2 = RedisCache(redis_server, {})
+        worker_1.set('gen:posts', 1, None)
+        worker_2.incr('gen:posts')
+        assert worker_1.get('gen:posts') == 2, \
+            'Проверьте, что разные воркеры видят общий кэш'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_page_cache_with_redis(self, client, post, redis_server):
+        with override_settings(CACHES=redis_caches(redis_server)):
+            client.get('/')
+            Post.objects.create(text='Пост через общий кэш', author=post.author)
+            assert 'Пост через общий кэш' in client.get('/').content.decode()
+
+
+class TestCacheStats:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cache_stats_staff_only(self, user_client):
+        response = user_client.get('/admin/cache-stats/')
+        assert response.status_code in (301, 302), \
+            'Проверьте, что статистика кэша доступна только персоналу'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cache_stats(self, client, redis_server):
+        admin = get_user_model().objects.create_user(username='CacheAdmin', is_staff=True)
+        client.force_login(admin)
+        with override_settings(CACHES=redis_caches(redis_server)):
+            client.get('/')
+            client.get('/')
+            data = json.loads(client.get('/admin/cache-stats/').content)
+        assert data['healthy']
+        assert data['process']['hits'] > 0
+        assert 'keyspace_hits' in data['server']
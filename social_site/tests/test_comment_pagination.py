@@ -0,0 +1,86 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from posts.models import Comment
+from posts.pagination import (comment_page, COMMENTS_PER_PAGE,
+                              encode_comment_cursor)
+
+
+@pytest.fixture
+def comments(post, user):
+    created = timezone.now()
+    items = [Comment.objects.create(post=post, author=user, text=f'Комментарий {i}')
+             for i in range(COMMENTS_PER_PAGE + 5)]
+    # Два комментария с одинаковым временем: порядок задаёт id.
+    Comment.objects.filter(pk__in=[c.pk for c in items]).update(created=created)
+    for i, comment in enumerate(items[:-2]):
+        Comment.objects.filter(pk=comment.pk).update(created=created + timedelta(seconds=i))
+    return list(Comment.objects.filter(post=post).order_by('created', 'id'))
+
+
+class TestCommentPage:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pages_cover_all_comments(self, post, comments):
+        first = comment_page(post.comments.all())
+        assert list(first) == comments[:COMMENTS_PER_PAGE], \
+            'Первая страница должна содержать самые старые комментарии'
+        assert first.has_next() and not first.has_previous()
+
+        second = comment_page(post.comments.all(), first.next_cursor)
+        assert list(second) == comments[COMMENTS_PER_PAGE:], \
+            'Проверьте, что курсор учитывает `id` при одинаковом `created`'
+        assert not second.has_next() and second.has_previous()
+        assert second.next_cursor is None
+
+    @pytest.mark.django_db(transaction=True)
+    def test_broken_cursor(self, post, comments):
+        assert list(comment_page(post.comments.all(), 'битый')) == \
+            comments[:COMMENTS_PER_PAGE]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_authors_loaded(self, post, comments, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            names = [c.author.username for c in comment_page(post.comments.all())]
+        assert len(names) == COMMENTS_PER_PAGE
+
+
+class TestCommentViews:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_view_shows_first_page(self, client, post, comments):
+        response = client.get(f'/{post.author.username}/{post.id}/')
+        content = response.content.decode()
+        assert comments[0].text in content
+        assert comments[COMMENTS_PER_PAGE].text not in content, \
+            'Страница поста должна показывать только первую страницу комментариев'
+        cursor = encode_comment_cursor(comments[COMMENTS_PER_PAGE - 1])
+        assert f'/{post.author.username}/{post.id}/comments/?after={cursor}' in content, \
+            'Добавьте ссылку на следующую страницу комментариев'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_fragment(self, client, post, comments):
+        cursor = encode_comment_cursor(comments[COMMENTS_PER_PAGE - 1])
+        response = client.get(f'/{post.author.username}/{post.id}/comments/?after={cursor}')
+        assert response.status_code == 200
+        content = response.content.decode()
+        assert comments[-1].text in content
+        assert f'name="comment_{comments[0].id}"' not in content
+        assert '<html' not in content, \
+            'Фрагмент комментариев не должен содержать страницу целиком'
+        assert 'data-comments-more' not in content, \
+            'На последней странице не должно быть ссылки «Показать ещё»'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_fragment_not_found(self, client, post):
+        response = client.get(f'/missing/{post.id}/comments/')
+        assert response.status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_invalid_comment_keeps_page(self, user_client, post, comments):
+        response = user_client.post(f'/{post.author.username}/{post.id}/comment',
+                                    data={'text': ''})
+        assert response.status_code == 200
+        assert len(response.context['items']) == COMMENTS_PER_PAGE
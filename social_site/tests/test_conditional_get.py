@@ -0,0 +1,76 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+
+from posts.models import Comment, Post
+
+
+def revalidate(client, url, etag):
+    return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+
+class TestConditionalGet:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_not_modified_without_rendering(self, client, post, django_assert_num_queries):
+        url = f'/{post.author.username}/{post.id}/'
+        response = client.get(url)
+        etag = response['ETag']
+        assert etag, 'Проверьте, что страница поста отдаёт ETag'
+        assert response['Cache-Control'] == 'no-cache'
+
+        with django_assert_num_queries(0):
+            response = revalidate(client, url, etag)
+        assert response.status_code == 304, \
+            'Неизменённая страница должна отвечать 304 без запросов к базе'
+        assert not response.content
+
+    @pytest.mark.django_db(transaction=True)
+    def test_changes_update_etag(self, client, post_with_group, user):
+        post = post_with_group
+        urls = ['/', f'/group/{post.group.slug}', f'/{post.author.username}/',
+                f'/{post.author.username}/{post.id}/']
+        etags = {url: client.get(url)['ETag'] for url in urls}
+
+        Comment.objects.create(post=post, author=user, text='Новый комментарий')
+        for url in urls:
+            response = revalidate(client, url, etags[url])
+            assert response.status_code == 200, \
+                f'Проверьте, что комментарий меняет ETag страницы `{url}`'
+            assert response['ETag'] != etags[url]
+
+        etag = client.get('/')['ETag']
+        Post.objects.create(text='Новый пост', author=user)
+        assert revalidate(client, '/', etag).status_code == 200
+
+    @pytest.mark.django_db(transaction=True)
+    def test_etag_depends_on_user(self, client, user, post):
+        anonymous = client.get('/')['ETag']
+        client.force_login(user)
+        response = client.get('/')
+        assert response['ETag'] != anonymous, \
+            'Страница вошедшего пользователя должна иметь свой ETag'
+        assert 'private' in response['Cache-Control']
+        assert revalidate(client, '/', anonymous).status_code == 200
+        assert revalidate(client, '/', response['ETag']).status_code == 304
+
+    @pytest.mark.django_db(transaction=True)
+    def test_other_pages_use_middleware(self, client, post):
+        response = client.get('/search/', {'q': 'текст'})
+        assert response.has_header('ETag'), \
+            'Подключите ConditionalGetMiddleware для остальных страниц'
+        response = client.get('/search/', {'q': 'текст'},
+                              HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == 304
+
+    @pytest.mark.urls('tests.async_urls')
+    @pytest.mark.django_db(transaction=True)
+    def test_async_views(self, client, post):
+        url = f'/{post.author.username}/'
+        etag = client.get(url)['ETag']
+
+        async def get():
+            # AsyncClient в Django 3.1 принимает заголовки ASGI как есть.
+            return await AsyncClient().get(url, **{'if-none-match': etag})
+        assert async_to_sync(get)().status_code == 304, \
+            'Проверьте ETag асинхронных вьюх'
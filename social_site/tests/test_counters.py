@@ -0,0 +1,82 @@
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from posts.models import Comment, Follow, Post, UserStats
+
+
+class TestCounters:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_counters_follow_writes(self, user_client, user):
+        author = get_user_model().objects.create_user(username='CountAuthor')
+        user_client.get(f'/{author.username}/follow/')
+        post = Post.objects.create(text='Пост', author=author)
+        user_client.post(f'/{author.username}/{post.id}/comment',
+                         data={'text': 'Комментарий'})
+
+        post.refresh_from_db()
+        assert post.comment_count == 1, \
+            'Проверьте, что `comment_count` растёт при добавлении комментария'
+        author.stats.refresh_from_db()
+        assert author.stats.posts_count == 1
+        assert author.stats.followers_count == 1
+        assert UserStats.objects.get(user=user).following_count == 1
+
+        Comment.objects.filter(post=post).delete()
+        post.refresh_from_db()
+        assert post.comment_count == 0, \
+            'Проверьте, что `comment_count` уменьшается при удалении комментария'
+
+        user_client.get(f'/{author.username}/unfollow/')
+        author.stats.refresh_from_db()
+        assert author.stats.followers_count == 0, \
+            'Проверьте, что счётчик подписчиков уменьшается при отписке'
+
+        post.delete()
+        author.stats.refresh_from_db()
+        assert author.stats.posts_count == 0, \
+            'Проверьте, что счётчик постов уменьшается при удалении поста'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_profile_uses_counters(self, client, post):
+        response = client.get(f'/{post.author.username}/')
+        assert response.context['posts_count'] == 1
+        assert 'Записей: 1' in response.content.decode()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_reconcile_counters_command(self, user, post):
+        other = get_user_model().objects.create_user(username='CountOther')
+        Follow.objects.create(user=other, author=user)
+        Comment.objects.create(post=post, author=other, text='Комментарий')
+        Post.objects.update(comment_count=7)
+        UserStats.objects.update(posts_count=5, followers_count=0)
+
+        call_command('reconcile_counters', stdout=StringIO())
+
+        post.refresh_from_db()
+        assert post.comment_count == 1, \
+            'Проверьте, что `reconcile_counters` исправляет `comment_count`'
+        stats = UserStats.objects.get(user=user)
+        assert (stats.posts_count, stats.followers_count, stats.following_count) == (1, 1, 0)
+        stats = UserStats.objects.get(user=other)
+        assert (stats.posts_count, stats.followers_count, stats.following_count) == (0, 0, 1)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_delete_user(self, user, post):
+        other = get_user_model().objects.create_user(username='CountOther')
+        Follow.objects.create(user=other, author=user)
+        Follow.objects.create(user=user, author=other)
+        Post.objects.create(text='Ещё пост', author=user)
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        Comment.objects.create(post=post, author=other, text='Ответ')
+
+        user.delete()
+
+        assert not UserStats.objects.filter(user=user.pk).exists(), \
+            'Проверьте, что удаление пользователя не создаёт его счётчики заново'
+        stats = UserStats.objects.get(user=other)
+        assert (stats.posts_count, stats.followers_count, stats.following_count) == (0, 0, 0), \
+            'Проверьте счётчики подписок после удаления пользователя'
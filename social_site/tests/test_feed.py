@@ -0,0 +1,104 @@
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from posts.models import FeedItem, Follow, Post
+
+
+class TestFollowFeed:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_filled_on_write(self, user_client, user):
+        author = get_user_model().objects.create_user(username='FeedAuthor')
+        old_post = Post.objects.create(text='Старый пост', author=author)
+        Follow.objects.create(user=user, author=author)
+        assert FeedItem.objects.filter(user=user, post=old_post).exists(), \
+            'Проверьте, что при подписке посты автора попадают в ленту подписчика'
+
+        user_client.post('/new/', data={'text': 'Свежий пост'})
+        new_post = Post.objects.create(text='Новый пост', author=author)
+        assert FeedItem.objects.filter(user=user, post=new_post).exists(), \
+            'Проверьте, что новый пост раскладывается по лентам подписчиков'
+
+        response = user_client.get('/follow/')
+        assert list(response.context['page']) == [new_post, old_post], \
+            'Проверьте, что `/follow/` читает посты из материализованной ленты'
+
+        Follow.objects.filter(user=user, author=author).delete()
+        assert not FeedItem.objects.filter(user=user).exists(), \
+            'Проверьте, что при отписке посты автора удаляются из ленты'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_pull_for_popular_authors(self, user_client, user, settings):
+        settings.FEED_FANOUT_MAX_FOLLOWERS = 0
+        author = get_user_model().objects.create_user(username='FeedStar')
+        Follow.objects.create(user=user, author=author)
+        post = Post.objects.create(text='Пост звезды', author=author)
+        assert not FeedItem.objects.exists(), \
+            'Проверьте, что посты популярных авторов не раскладываются по лентам'
+
+        response = user_client.get('/follow/')
+        assert list(response.context['page']) == [post], \
+            'Проверьте, что посты популярных авторов подмешиваются при чтении'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_author_back_under_limit(self, user_client, user, settings):
+        settings.FEED_FANOUT_MAX_FOLLOWERS = 1
+        author = get_user_model().objects.create_user(username='FeedStar')
+        other = get_user_model().objects.create_user(username='FeedFan')
+        Follow.objects.create(user=user, author=author)
+        Follow.objects.create(user=other, author=author)
+        post = Post.objects.create(text='Пост звезды', author=author)
+        assert not FeedItem.objects.exists()
+
+        Follow.objects.filter(user=other).delete()
+        assert not FeedItem.objects.exists(), \
+            'Отписка не должна раскладывать посты автора в запросе'
+        response = user_client.get('/follow/')
+        assert list(response.context['page']) == [post], \
+            'Проверьте, что посты автора, вернувшегося под порог, остаются в ленте'
+
+        call_command('rebuild_feed', '--backfill', stdout=StringIO())
+        assert list(FeedItem.objects.values_list('user', 'post')) == \
+            [(user.id, post.id)], \
+            'Проверьте, что `rebuild_feed --backfill` раскладывает посты автора'
+        assert list(user_client.get('/follow/').context['page']) == [post]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_fanout_hysteresis(self, user, settings):
+        settings.FEED_FANOUT_MAX_FOLLOWERS = 2
+        settings.FEED_FANOUT_MIN_FOLLOWERS = 1
+        author = get_user_model().objects.create_user(username='FeedStar')
+        fans = [get_user_model().objects.create_user(username=f'FeedFan{i}')
+                for i in range(2)]
+        Post.objects.create(text='Пост звезды', author=author)
+        Follow.objects.create(user=fans[0], author=author)
+        Follow.objects.create(user=fans[1], author=author)
+        Follow.objects.create(user=user, author=author)
+        FeedItem.objects.all().delete()
+
+        for _ in range(2):
+            Follow.objects.filter(user=user).delete()
+            call_command('rebuild_feed', '--backfill', stdout=StringIO())
+            Follow.objects.create(user=user, author=author)
+        assert not FeedItem.objects.exists(), \
+            'Автор у порога не должен возвращаться к раскладке'
+
+        Follow.objects.filter(user__in=fans).delete()
+        call_command('rebuild_feed', '--backfill', stdout=StringIO())
+        assert FeedItem.objects.filter(user=user).count() == 1, \
+            'Ниже FEED_FANOUT_MIN_FOLLOWERS автор возвращается к раскладке'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rebuild_feed_command(self, user):
+        author = get_user_model().objects.create_user(username='FeedAuthor')
+        Follow.objects.create(user=user, author=author)
+        Post.objects.create(text='Пост 1', author=author)
+        Post.objects.create(text='Пост 2', author=author)
+        FeedItem.objects.all().delete()
+
+        call_command('rebuild_feed', stdout=StringIO())
+        assert FeedItem.objects.filter(user=user).count() == 2, \
+            'Проверьте, что команда `rebuild_feed` восстанавливает ленту'
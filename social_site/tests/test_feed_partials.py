@@ -0,0 +1,65 @@
+import re
+
+import pytest
+
+from posts.models import Follow, Post
+from posts.pagination import PER_PAGE
+
+
+NEXT = re.compile(r'data-feed-next="([^"]+)"')
+
+
+def scroll(client, url):
+    """Проходит ленту так же, как JS из base.html: первая страница и порции."""
+    content = client.get(url).content.decode()
+    batches = [content]
+    while NEXT.search(content):
+        next_url = url.split('?')[0] + NEXT.search(content).group(1).replace('&amp;', '&')
+        response = client.get(next_url)
+        assert response.status_code == 200, f'Порция `{next_url}` недоступна'
+        content = response.content.decode()
+        batches.append(content)
+    return batches
+
+
+@pytest.fixture
+def many_posts(user, group):
+    return [Post.objects.create(text=f'Пост №{i}.', author=user, group=group)
+            for i in range(PER_PAGE * 2 + 3)]
+
+
+class TestFeedPartials:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('url', ['/', '/?page=1', '/?after='])
+    def test_scroll_index(self, client, many_posts, url):
+        batches = scroll(client, url)
+        assert len(batches) == 3
+        texts = re.findall(r'Пост №\d+\.', ''.join(batches))
+        assert texts == [post.text for post in reversed(many_posts)], \
+            'Порции ленты должны идти подряд, без пропусков и повторов'
+        for batch in batches[1:]:
+            assert '<html' not in batch and 'feed-pager' not in batch, \
+                'Порция ленты не должна содержать страницу целиком'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_scroll_group_and_profile(self, client, many_posts, user, group):
+        for url in (f'/group/{group.slug}', f'/{user.username}/'):
+            batches = scroll(client, url)
+            assert len(re.findall(r'Пост №\d+\.', ''.join(batches))) == len(many_posts), \
+                f'Проверьте бесконечную прокрутку на странице `{url}`'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_scroll_follow_index(self, user_client, user, django_user_model):
+        author = django_user_model.objects.create_user(username='Author')
+        Follow.objects.create(user=user, author=author)
+        for i in range(PER_PAGE + 1):
+            Post.objects.create(text=f'Пост №{i}.', author=author)
+        batches = scroll(user_client, '/follow/')
+        assert len(re.findall(r'Пост №\d+\.', ''.join(batches))) == PER_PAGE + 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_last_page_has_no_marker(self, client, post):
+        content = client.get('/?after=&partial=1').content.decode()
+        assert post.text in content
+        assert 'data-feed-next' not in content
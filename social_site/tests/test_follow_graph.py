@@ -0,0 +1,126 @@
+import threading
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from posts import follow_graph
+from posts.models import Follow
+
+
+@pytest.fixture
+def authors():
+    User = get_user_model()
+    return [User.objects.create_user(username=f'GraphAuthor{i}') for i in range(5)]
+
+
+class TestFollowGraph:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_membership_counts_and_batch(self, user, authors,
+                                         django_assert_num_queries):
+        for author in authors[1:4]:
+            Follow.objects.create(user=user, author=author)
+
+        assert list(follow_graph.followees(user.id)) == sorted(a.id for a in authors[1:4])
+        with django_assert_num_queries(0):
+            assert follow_graph.follows(user.id, authors[2].id)
+            assert not follow_graph.follows(user.id, authors[0].id)
+            assert follow_graph.following_count(user.id) == 3
+            assert follow_graph.followed_among(
+                user.id, [a.id for a in authors]) == {a.id for a in authors[1:4]}
+        assert follow_graph.followers_count(authors[1].id) == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_signals_update_cached_arrays(self, user, authors, django_assert_num_queries):
+        follow_graph.followees(user.id)
+        follow_graph.followers_count(authors[0].id)
+        Follow.objects.create(user=user, author=authors[0])
+        with django_assert_num_queries(0):
+            assert follow_graph.follows(user.id, authors[0].id), \
+                'Подписка должна попадать в закэшированный граф без перестроения'
+            assert follow_graph.followers_count(authors[0].id) == 1
+
+        Follow.objects.filter(user=user, author=authors[0]).delete()
+        with django_assert_num_queries(0):
+            assert not follow_graph.follows(user.id, authors[0].id)
+            assert follow_graph.followers_count(authors[0].id) == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rolled_back_follow(self, user, authors):
+        follow_graph.followees(user.id)
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                Follow.objects.create(user=user, author=authors[0])
+                raise RuntimeError
+        assert not follow_graph.follows(user.id, authors[0].id), \
+            'Откаченная подписка не должна попадать в граф'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_fill_skipped_while_locked(self, user, authors):
+        key = f'follow:followees:{user.id}'
+        cache.add(f'{key}:lock', 1)
+        Follow.objects.create(user=user, author=authors[0])
+        assert follow_graph.follows(user.id, authors[0].id)
+        assert cache.get(key) is None, \
+            'Без блокировки массив из базы не должен попадать в кэш'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_patch_waits_for_lock(self, user, authors):
+        follow_graph.followees(user.id)
+        lock = f'follow:followees:{user.id}:lock'
+        cache.add(lock, 1)
+        release = threading.Timer(0.1, cache.delete, [lock])
+        release.start()
+        Follow.objects.create(user=user, author=authors[0])
+        release.join()
+        assert cache.get(f'follow:followees:{user.id}') is not None
+        assert follow_graph.follows(user.id, authors[0].id), \
+            'Правка должна дождаться блокировки, а не потеряться'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_patch_gives_up(self, user, authors, monkeypatch):
+        monkeypatch.setattr(follow_graph, 'LOCK_WAIT', 0)
+        follow_graph.followees(user.id)
+        cache.add(f'follow:followees:{user.id}:lock', 1)
+        Follow.objects.create(user=user, author=authors[0])
+        assert cache.get(f'follow:followees:{user.id}') is None, \
+            'Не дождавшись блокировки, правка должна сбросить массив'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_compact_storage(self, user, authors):
+        for author in authors:
+            Follow.objects.create(user=user, author=author)
+        follow_graph.followees(user.id)
+        data = cache.get(f'follow:followees:{user.id}')
+        assert isinstance(data, bytes) and len(data) == 4 * len(authors), \
+            'Граф должен храниться массивом по 4 байта на подписку'
+
+
+class TestProfileFollowButton:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_button_reflects_viewer(self, user_client, user, authors):
+        author, other = authors[0], authors[1]
+        Follow.objects.create(user=other, author=author)
+
+        response = user_client.get(f'/{author.username}/')
+        assert response.context['is_following'] is False
+        assert 'Подписаться' in response.content.decode(), \
+            'Кнопка должна зависеть от подписки зрителя, а не от числа подписчиков'
+
+        user_client.get(f'/{author.username}/follow/')
+        response = user_client.get(f'/{author.username}/')
+        assert response.context['is_following'] is True
+        assert 'Отписаться' in response.content.decode()
+
+        user_client.get(f'/{author.username}/unfollow/')
+        assert user_client.get(f'/{author.username}/').context['is_following'] is False
+
+    @pytest.mark.urls('tests.async_urls')
+    @pytest.mark.django_db(transaction=True)
+    def test_async_profile(self, user_client, user, authors):
+        Follow.objects.create(user=user, author=authors[0])
+        response = user_client.get(f'/{authors[0].username}/')
+        assert 'Отписаться' in response.content.decode()
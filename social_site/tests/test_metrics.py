@@ -0,0 +1,67 @@
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+
+from social_site import metrics
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+@pytest.fixture
+def admin():
+    return get_user_model().objects.create_user(username='MetricsAdmin', is_staff=True)
+
+
+class TestMetrics:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_route_metrics(self, client, admin, post):
+        client.get('/')
+        client.get('/')
+        client.get(f'/{post.author.username}/{post.id}/')
+        client.get('/no-such-user/')
+        client.force_login(admin)
+        routes = json.loads(client.get('/admin/metrics/').content)['routes']
+
+        index = routes['index']
+        assert index['requests'] == 2
+        assert index['statuses'] == {'200': 2}
+        assert index['db']['queries'] > 0, \
+            'Проверьте, что метрики считают SQL запросы маршрута'
+        assert index['template_ms'] > 0, \
+            'Проверьте, что метрики замеряют рендеринг шаблонов'
+        assert index['cache']['hits'] > 0, \
+            'Проверьте, что метрики считают попадания в кэш'
+        assert sum(index['latency_ms']['buckets'].values()) == 2
+        assert routes['post']['requests'] == 1
+        assert routes['profile']['statuses'] == {'404': 1}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_prometheus(self, client, admin, settings):
+        client.force_login(admin)
+        client.get('/')
+        text = client.get('/admin/metrics/prometheus/').content.decode()
+        assert 'django_request_duration_seconds_bucket{view="index",le="+Inf"} 1' in text
+        assert 'django_requests_total{view="index",status="200"} 1' in text
+        assert '# TYPE django_db_queries_total counter' in text
+
+        client.logout()
+        assert client.get('/admin/metrics/prometheus/').status_code == 403, \
+            'Проверьте, что метрики доступны только персоналу'
+        settings.METRICS_TOKEN = 'secret'
+        response = client.get('/admin/metrics/prometheus/',
+                              HTTP_AUTHORIZATION='Bearer secret')
+        assert response.status_code == 200, \
+            'Проверьте, что Prometheus может забирать метрики по токену'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_metrics_staff_only(self, user_client):
+        response = user_client.get('/admin/metrics/')
+        assert response.status_code in (301, 302), \
+            'Проверьте, что метрики доступны только персоналу'
@@ -0,0 +1,74 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Follow, Post
+
+
+class TestPageCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_index_cached_until_new_post(self, client, post, django_assert_num_queries):
+        client.get('/')
+        with django_assert_num_queries(0):
+            response = client.get('/')
+        assert post.text in response.content.decode(), \
+            'Проверьте, что из кэша отдаётся та же страница'
+
+        Post.objects.create(text='Пост после кэша', author=post.author)
+        response = client.get('/')
+        assert 'Пост после кэша' in response.content.decode(), \
+            'Проверьте, что новый пост сбрасывает кэш главной страницы'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_and_group_invalidated_by_comment(self, client, user, post_with_group):
+        post_url = f'/{user.username}/{post_with_group.id}/'
+        group_url = f'/group/{post_with_group.group.slug}'
+        client.get(post_url)
+        client.get(group_url)
+
+        Comment.objects.create(post=post_with_group, author=user, text='Кэш сброшен')
+        assert 'Кэш сброшен' in client.get(post_url).content.decode(), \
+            'Проверьте, что комментарий сбрасывает кэш страницы поста'
+        assert '1 комментариев' in client.get(group_url).content.decode(), \
+            'Проверьте, что комментарий сбрасывает кэш страницы группы'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_profile_invalidated_by_follow(self, client, user):
+        reader = get_user_model().objects.create_user(username='CacheReader')
+        client.get(f'/{user.username}/')
+        Follow.objects.create(user=reader, author=user)
+        response = client.get(f'/{user.username}/')
+        assert 'Подписчиков: 1' in response.content.decode(), \
+            'Проверьте, что подписка сбрасывает кэш профиля'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_authenticated_not_cached(self, user_client, post):
+        user_client.get('/')
+        response = user_client.get('/')
+        assert 'page' in response.context, \
+            'Проверьте, что авторизованным пользователям страница не отдаётся из кэша'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_user_saves_keep_other_pages(self, client, user, post):
+        profile_url = f'/{user.username}/'
+        client.get('/')
+        client.get(profile_url)
+        get_user_model().objects.create_user(username='NewSignup')
+        user.set_password('new-password')
+        user.save()
+        with CaptureQueriesContext(connection) as context:
+            client.get('/')
+            client.get(profile_url)
+        assert not context.captured_queries, \
+            'Регистрация и смена пароля не должны сбрасывать кэш страниц'
+
+        user.first_name = 'Новое имя'
+        user.save()
+        assert 'Новое имя' in client.get(profile_url).content.decode(), \
+            'Смена имени должна сбрасывать страницу автора'
+        with CaptureQueriesContext(connection) as context:
+            client.get('/')
+        assert not context.captured_queries, \
+            'Смена имени не должна сбрасывать чужие страницы'
@@ -36,3 +36,36 @@ class TestGroupPaginatorView:
             'Проверьте, что передали переменную `page` в контекст страницы `/`'
         assert type(response.context['page']) == Page, \
             'Проверьте, что переменная `page` на странице `/` типа `Page`'
+
+
+class TestCursorPaginatorView:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_index_cursor_pages(self, client, user):
+        from posts.models import Post
+        from posts.pagination import CursorPage
+        posts = [Post.objects.create(text=f'Пост {i}', author=user) for i in range(15)]
+        newest_first = posts[::-1]
+
+        response = client.get('/?after=')
+        page = response.context['page']
+        assert type(page) == CursorPage, \
+            'Проверьте, что `?after=` включает курсорную пагинацию'
+        assert list(page) == newest_first[:10]
+        assert page.has_next() and not page.has_previous()
+
+        response = client.get(f'/?after={page.next_cursor}')
+        next_page = response.context['page']
+        assert list(next_page) == newest_first[10:], \
+            'Проверьте, что `?after=` отдаёт следующие посты по ключу `(pub_date, id)`'
+        assert not next_page.has_next() and next_page.has_previous()
+
+        response = client.get(f'/?before={next_page.previous_cursor}')
+        assert list(response.context['page']) == newest_first[:10], \
+            'Проверьте, что `?before=` возвращает на предыдущую страницу'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_broken_cursor_gives_first_page(self, client, post):
+        response = client.get('/?after=not-a-cursor')
+        assert response.status_code == 200
+        assert list(response.context['page']) == [post]
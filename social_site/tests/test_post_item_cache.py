@@ -0,0 +1,26 @@
+import pytest
+from django.contrib.auth import get_user_model
+
+
+class TestPostItemCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_edit_invalidates_fragment(self, user_client, post):
+        user_client.get('/')
+        response = user_client.post(f'/{post.author.username}/{post.id}/edit/',
+                                    data={'text': 'Исправленный текст'})
+        assert response.status_code in (301, 302)
+        content = user_client.get('/').content.decode()
+        assert 'Исправленный текст' in content, \
+            'Проверьте, что редактирование поста сбрасывает кэш его карточки'
+        assert post.text not in content
+
+    @pytest.mark.django_db(transaction=True)
+    def test_edit_link_not_cached(self, client, user_client, post):
+        assert 'Редактировать' in user_client.get('/').content.decode(), \
+            'Проверьте, что автор видит ссылку на редактирование'
+
+        other = get_user_model().objects.create_user(username='FragmentReader')
+        client.force_login(other)
+        assert 'Редактировать' not in client.get('/').content.decode(), \
+            'Проверьте, что ссылка на редактирование не попадает в общий кэш карточки'
@@ -0,0 +1,44 @@
+import io
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from posts.models import Comment, Follow, Post
+
+
+@pytest.fixture
+def busy_feed(user, group):
+    author = get_user_model().objects.create_user(username='QueryAuthor')
+    Follow.objects.create(user=user, author=author)
+    for i in range(12):
+        post = Post.objects.create(text=f'Пост {i}', author=author, group=group)
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+    # Списки популярного обновляет по расписанию refresh_trending.
+    call_command('refresh_trending', stdout=io.StringIO())
+    return author
+
+
+class TestFeedQueryBudget:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_anonymous_listings(self, client, busy_feed, group, assert_page_queries):
+        assert_page_queries(client, '/', 2)
+        assert_page_queries(client, '/?page=2', 2)
+        assert_page_queries(client, '/?after=', 1)
+        assert_page_queries(client, f'/group/{group.slug}', 3)
+        assert_page_queries(client, f'/{busy_feed.username}/', 4)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_comments(self, client, user, post, assert_page_queries):
+        for i in range(20):
+            Comment.objects.create(post=post, author=user, text=f'Комментарий {i}')
+        url = f'/{post.author.username}/{post.id}/'
+        assert_page_queries(client, url, 5)
+        assert_page_queries(client, url + 'comments/', 2)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_index(self, user_client, busy_feed, assert_page_queries):
+        assert_page_queries(user_client, '/follow/', 5)
+        # Сессия и пользователь уже в кэше; панель рекомендаций - один запрос.
+        assert_page_queries(user_client, '/follow/', 4)
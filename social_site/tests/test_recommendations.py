@@ -0,0 +1,91 @@
+import io
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from posts import follow_graph, recommendations
+from posts.models import Comment, Follow, Post, Recommendation
+
+
+@pytest.fixture
+def graph(user):
+    User = get_user_model()
+    people = {name: User.objects.create_user(username=name)
+              for name in ('anna', 'boris', 'clara', 'denis', 'eva')}
+    for follower, author in [(user, people['anna']), (user, people['boris']),
+                             (people['anna'], people['clara']),
+                             (people['anna'], people['denis']),
+                             (people['boris'], people['clara']),
+                             (people['anna'], user)]:
+        Follow.objects.create(user=follower, author=author)
+    post = Post.objects.create(text='Обсуждение', author=people['boris'])
+    Comment.objects.create(post=post, author=user, text='Первый')
+    Comment.objects.create(post=post, author=people['eva'], text='Второй')
+    return people
+
+
+def names(user):
+    return [candidate['username'] for candidate in recommendations.for_user(user)]
+
+
+class TestRecommendations:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_scores(self, user, graph):
+        scores = dict(recommendations.compute())
+        top = scores[user.id]
+        assert [author_id for author_id, _ in top] == \
+            [graph['clara'].id, graph['denis'].id, graph['eva'].id], \
+            'Друзья друзей идут по числу общих подписок, затем соавторы комментариев'
+        assert [score for _, score in top] == [2, 1, 0.5]
+        assert user.id not in {author_id for author_id, _ in scores[graph['anna'].id]}, \
+            'Проверьте, что из рекомендаций исключены сам пользователь и его подписки'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_panel_is_one_lookup(self, user, graph, django_assert_num_queries):
+        assert recommendations.rebuild() == Recommendation.objects.count()
+        follow_graph.followees(user.id)
+        with django_assert_num_queries(1):
+            assert names(user) == ['clara', 'denis', 'eva']
+
+        Follow.objects.create(user=user, author=graph['clara'])
+        assert names(user) == ['denis', 'eva'], \
+            'Подписка после пересчёта должна убирать автора из панели'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rebuild_drops_stale_rows(self, user, graph):
+        recommendations.rebuild()
+        Follow.objects.filter(user=graph['anna']).delete()
+        Follow.objects.filter(author=graph['anna']).delete()
+        recommendations.rebuild()
+        assert not Recommendation.objects.filter(user=graph['anna']).exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_hub_posts_are_skipped(self, user, graph, monkeypatch):
+        monkeypatch.setattr(recommendations, 'HUB_LIMIT', 1)
+        top = dict(recommendations.compute())[user.id]
+        assert graph['eva'].id not in {author_id for author_id, _ in top}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_panels(self, user_client, user, graph):
+        call_command('rebuild_recommendations', stdout=io.StringIO())
+        for url in ('/follow/', f'/{graph["anna"].username}/'):
+            content = user_client.get(url).content.decode()
+            assert 'На кого подписаться' in content and '@clara' in content, \
+                f'Добавьте панель рекомендаций на страницу `{url}`'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_panel_revalidation(self, user_client, user, graph):
+        url = f'/{graph["eva"].username}/'
+        etag = user_client.get(url)['ETag']
+        call_command('rebuild_recommendations', stdout=io.StringIO())
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and '@clara' in response.content.decode(), \
+            'Пересчёт рекомендаций должен сбрасывать ETag страниц с панелью'
+
+        etag = response['ETag']
+        Follow.objects.create(user=user, author=graph['clara'])
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and '@clara' not in response.content.decode(), \
+            'Подписка зрителя должна сбрасывать ETag страниц с его панелью'
@@ -0,0 +1,58 @@
+import pytest
+from django.test import Client
+
+from posts.models import Post
+from posts.replicas import PIN_COOKIE, ReplicaRouter
+
+
+@pytest.fixture(autouse=True)
+def no_page_cache(settings):
+    settings.PAGE_CACHE_TIMEOUT = 0
+
+
+class TestReplicaRouting:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_listing_reads_from_replica(self, client, user, replica):
+        post = Post.objects.create(text='Пост до репликации', author=user)
+        assert post.text not in client.get('/').content.decode(), \
+            'Проверьте, что ленты читаются с реплики'
+        assert client.get(f'/{user.username}/{post.id}/').status_code == 404
+        replica.sync()
+        assert post.text in client.get('/').content.decode()
+        assert client.get(f'/{user.username}/{post.id}/').status_code == 200
+
+    @pytest.mark.django_db(transaction=True)
+    def test_read_your_writes(self, user_client, replica):
+        replica.sync()
+        response = user_client.post('/new/', data={'text': 'Мой новый пост'})
+        assert response.status_code == 302
+        assert PIN_COOKIE in response.cookies, \
+            'Проверьте, что после записи браузер закрепляется за основной базой'
+        assert 'Мой новый пост' in user_client.get('/').content.decode(), \
+            'Проверьте, что автор сразу видит свой пост после редиректа'
+        assert 'Мой новый пост' not in Client().get('/').content.decode(), \
+            'Проверьте, что остальные читают с реплики'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pin_expires(self, user_client, replica, settings):
+        replica.sync()
+        user_client.post('/new/', data={'text': 'Пост с закреплением'})
+        assert user_client.cookies[PIN_COOKIE]['max-age'] == settings.REPLICA_PIN_SECONDS
+        del user_client.cookies[PIN_COOKIE]
+        assert 'Пост с закреплением' not in user_client.get('/').content.decode()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_other_views_read_primary(self, client, user, replica):
+        Post.objects.create(text='Пост только в основной базе', author=user)
+        response = client.get('/search/?q=основной')
+        assert len(response.context['page']) == 1, \
+            'Проверьте, что вьюхи без replica_reads читают из default'
+
+    def test_router(self, settings):
+        settings.DATABASE_REPLICAS = ['replica']
+        router = ReplicaRouter()
+        assert router.db_for_write(Post) == 'default'
+        assert router.db_for_read(Post) == 'default'
+        assert not router.allow_migrate('replica', 'posts')
+        assert router.allow_migrate('default', 'posts')
@@ -0,0 +1,84 @@
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+
+from posts import search
+from posts.models import Comment, Group, Post
+
+
+def found(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, 'Страница `/search/` не найдена'
+    return [post.id for post in response.context['page']]
+
+
+class TestSearch:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_posts_and_comments(self, client, user):
+        post_1 = Post.objects.create(text='Рецепт борща со сметаной', author=user)
+        post_2 = Post.objects.create(text='Прогулка по парку', author=user)
+        Comment.objects.create(post=post_2, author=user, text='Лучший борщ у бабушки')
+        Post.objects.create(text='Совсем другое', author=user)
+
+        assert set(found(client, '/search/?q=борщ')) == {post_1.id, post_2.id}, \
+            'Проверьте, что поиск находит посты по тексту и по комментариям'
+        assert found(client, '/search/?q=сметана борщ') == [], \
+            'Проверьте, что все слова запроса должны встретиться'
+        assert found(client, '/search/?q=') == []
+
+        post_1.text = 'Рецепт щей'
+        post_1.save()
+        assert found(client, '/search/?q=борщ') == [post_2.id], \
+            'Проверьте, что индекс обновляется при редактировании поста'
+        Comment.objects.filter(post=post_2).delete()
+        assert found(client, '/search/?q=борщ') == [], \
+            'Проверьте, что индекс обновляется при удалении комментария'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_filters(self, client, user):
+        group = Group.objects.create(title='Кухня', slug='kitchen')
+        other = get_user_model().objects.create_user(username='SearchOther')
+        in_group = Post.objects.create(text='Пирог с яблоками', author=user, group=group)
+        by_other = Post.objects.create(text='Пирог с вишней', author=other)
+
+        assert found(client, '/search/?q=пирог&group=kitchen') == [in_group.id]
+        assert found(client, '/search/?q=пирог&author=SearchOther') == [by_other.id]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_ranking_and_pages(self, client, user):
+        best = Post.objects.create(text='кот кот кот кот', author=user)
+        for i in range(12):
+            Post.objects.create(text=f'кот и собака номер {i} гуляли вместе долго', author=user)
+
+        response = client.get('/search/?q=кот')
+        first = [post.id for post in response.context['page']]
+        assert first[0] == best.id, 'Проверьте, что результаты ранжируются по BM25'
+        assert len(first) == 10
+        next_query = response.context['next_query']
+        assert next_query and 'q=' in next_query
+
+        second = found(client, f'/search/?{next_query}')
+        assert len(second) == 3 and not set(first) & set(second), \
+            'Проверьте, что следующая страница продолжает выдачу без повторов'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rebuild_search_index(self, client, user):
+        post = Post.objects.create(text='Забытый пост', author=user)
+        search.get_backend().clear()
+        assert found(client, '/search/?q=забытый') == []
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        assert found(client, '/search/?q=забытый') == [post.id], \
+            'Проверьте, что `rebuild_search_index` восстанавливает индекс'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_migrate_below_search_table(self):
+        call_command('migrate', 'posts', '0019', verbosity=0)
+        try:
+            assert search.SqliteFTSBackend.table not in connection.introspection.table_names()
+        finally:
+            call_command('migrate', 'posts', verbosity=0)
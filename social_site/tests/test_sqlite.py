@@ -0,0 +1,45 @@
+import pytest
+from django.db import connection
+
+from social_site.sqlite.base import DatabaseWrapper
+
+
+def pragma(cursor, name):
+    cursor.execute(f'PRAGMA {name}')
+    return cursor.fetchone()[0]
+
+
+def connect(settings_dict):
+    database = DatabaseWrapper(settings_dict, alias='other')
+    return database.get_new_connection(database.get_connection_params())
+
+
+class TestSqlitePragmas:
+
+    @pytest.mark.django_db
+    def test_pragmas_on_connect(self, settings):
+        with connection.cursor() as cursor:
+            assert pragma(cursor, 'busy_timeout') == settings.SQLITE_PRAGMAS['busy_timeout'], \
+                'Проверьте, что PRAGMA из настроек выполняются при подключении'
+            assert pragma(cursor, 'synchronous') == 1, 'Проверьте synchronous=NORMAL'
+            assert pragma(cursor, 'temp_store') == 2, 'Проверьте temp_store=MEMORY'
+            assert pragma(cursor, 'cache_size') == settings.SQLITE_PRAGMAS['cache_size']
+
+    def test_wal_on_file_database(self, tmp_path):
+        raw = connect({**connection.settings_dict,
+                       'NAME': str(tmp_path / 'db.sqlite3')})
+        try:
+            assert pragma(raw.cursor(), 'journal_mode') == 'wal', \
+                'Проверьте, что файловая база работает в режиме WAL'
+        finally:
+            raw.close()
+
+    def test_without_pragmas(self, tmp_path):
+        options = {**connection.settings_dict['OPTIONS'], 'pragmas': {}}
+        raw = connect({**connection.settings_dict,
+                       'NAME': str(tmp_path / 'db.sqlite3'),
+                       'OPTIONS': options})
+        try:
+            assert pragma(raw.cursor(), 'journal_mode') == 'delete'
+        finally:
+            raw.close()
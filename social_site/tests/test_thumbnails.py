@@ -0,0 +1,96 @@
+import os
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from PIL import Image
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def image_file(name):
+    buffer = BytesIO()
+    Image.new('RGB', size=(60, 40), color=(0, 128, 255)).save(buffer, 'png')
+    return ContentFile(buffer.getvalue(), name=name)
+
+
+def post_without_variants(user, name):
+    post = Post.objects.create(text='Пост', author=user)
+    post.image.save(name, image_file(name), save=False)
+    Post.objects.filter(pk=post.pk).update(image=post.image.name)
+    post.refresh_from_db()
+    return post
+
+
+class TestImageVariants:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_variants_built_on_new_post(self, user_client):
+        user_client.post('/new/', data={'text': 'Пост с картинкой',
+                                        'image': image_file('variants.png')})
+        post = Post.objects.get(text='Пост с картинкой')
+        assert thumbnails.ready(post), \
+            'Проверьте, что после сохранения поста строятся варианты картинки'
+
+        root = os.path.splitext(post.image.name)[0]
+        for width in thumbnails.WIDTHS:
+            for ext in ('webp', 'jpg'):
+                name = f'{root}.{width}w.{ext}'
+                assert default_storage.exists(name), f'Не найден вариант `{name}`'
+        with default_storage.open(f'{root}.320w.webp') as variant:
+            assert Image.open(variant).size == (320, 113)
+
+        content = user_client.get('/').content.decode()
+        assert f'{root}.640w.webp 640w' in content, \
+            'Проверьте, что карточка отдаёт варианты через `srcset`'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_original_until_ready(self, user, client, monkeypatch):
+        post = post_without_variants(user, 'variants_late.png')
+        monkeypatch.setattr(thumbnails, 'schedule', lambda name: None)
+        content = client.get('/').content.decode()
+        assert post.image.url in content, \
+            'Проверьте, что до готовности вариантов показывается оригинал'
+        assert 'srcset' not in content
+
+    @pytest.mark.django_db(transaction=True)
+    def test_warm_thumbnails_command(self, user):
+        post = post_without_variants(user, 'variants_warm.png')
+        call_command('warm_thumbnails', workers=2, stdout=StringIO())
+        post.refresh_from_db()
+        assert thumbnails.ready(post), \
+            'Проверьте, что команда `warm_thumbnails` строит недостающие варианты'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_variants_removed_with_image(self, user):
+        post = Post.objects.create(text='Пост', author=user,
+                                   image=image_file('variants_old.png'))
+        old = thumbnails.variant_names(post.image.name)
+        assert all(default_storage.exists(name) for name in old)
+
+        post.image = image_file('variants_new.png')
+        post.save()
+        assert not any(default_storage.exists(name) for name in old), \
+            'Проверьте, что при замене картинки старые варианты удаляются'
+        new = thumbnails.variant_names(post.image.name)
+        assert all(default_storage.exists(name) for name in new)
+
+        post.delete()
+        assert not any(default_storage.exists(name) for name in new), \
+            'Проверьте, что варианты удаляются вместе с постом'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rolled_back_schedule(self, user):
+        post = post_without_variants(user, 'variants_rollback.png')
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                thumbnails.schedule(post.image.name)
+                raise RuntimeError
+        thumbnails.schedule(post.image.name)
+        post.refresh_from_db()
+        assert thumbnails.ready(post), \
+            'Откаченная постановка в очередь не должна блокировать следующую'
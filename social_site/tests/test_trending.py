@@ -0,0 +1,148 @@
+import io
+import math
+import time
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts import page_cache, trending, view_counts
+from posts.models import Comment, Group, Post, TrendingScore
+
+
+@pytest.fixture
+def posts(user):
+    groups = [Group.objects.create(title=f'Сообщество {i}', slug=f'trend-{i}',
+                                   description='Описание') for i in range(2)]
+    return [Post.objects.create(text=f'Пост {i}', author=user, group=groups[i % 2])
+            for i in range(3)]
+
+
+def score(kind, object_id):
+    return TrendingScore.objects.get(kind=kind, object_id=object_id).score
+
+
+class TestTrendingScores:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_decayed_sum(self, posts, settings):
+        now = time.time()
+        half_life = settings.TRENDING_HALF_LIFE
+        trending.record(posts[0].id, None, 4, now=now - 2 * half_life)
+        trending.record(posts[0].id, None, 2, now=now)
+        assert math.isclose(trending.current(score('post', posts[0].id), now), 3), \
+            'Вес события должен затухать вдвое за TRENDING_HALF_LIFE'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_recent_beats_old(self, posts, settings):
+        now = time.time()
+        for _ in range(3):
+            trending.record(posts[0].id, posts[0].group_id, 1,
+                            now=now - 2 * settings.TRENDING_HALF_LIFE)
+        trending.record(posts[1].id, posts[1].group_id, 1, now=now)
+        assert [p.id for p in trending.top_posts()] == [posts[1].id, posts[0].id]
+        assert [g['slug'] for g in trending.top_groups()] == ['trend-1', 'trend-0']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comments_are_counted(self, posts, user):
+        Comment.objects.create(post=posts[2], author=user, text='Комментарий')
+        assert TrendingScore.objects.filter(object_id=posts[2].id, kind='post').exists()
+        assert TrendingScore.objects.filter(object_id=posts[2].group_id,
+                                            kind='group').exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_sampled_views(self, client, posts, settings):
+        url = f'/{posts[0].author.username}/{posts[0].id}/'
+        client.get(url)
+        assert not TrendingScore.objects.exists()
+
+        settings.TRENDING_VIEW_SAMPLE_RATE = 1
+        with CaptureQueriesContext(connection) as context:
+            client.get(url)
+            client.get(url)
+        assert not any('posts_trendingscore' in q['sql']
+                       for q in context.captured_queries), \
+            'Выборочные просмотры должны писаться вместе с буфером просмотров'
+        view_counts.flush()
+        assert math.isclose(trending.current(score('post', posts[0].id)),
+                            2 * trending.VIEW_WEIGHT, rel_tol=1e-3), \
+            'Просмотры из кэша страниц тоже должны учитываться'
+
+    @pytest.mark.urls('tests.async_urls')
+    @pytest.mark.django_db(transaction=True)
+    def test_sampled_views_async(self, client, posts, settings):
+        settings.TRENDING_VIEW_SAMPLE_RATE = 1
+        settings.VIEW_COUNTS_FLUSH_EVENTS = 1
+        client.get(f'/{posts[0].author.username}/{posts[0].id}/')
+        assert TrendingScore.objects.filter(object_id=posts[0].id, kind='post').exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_prune(self, posts, settings):
+        trending.record(posts[0].id, None, 1, now=time.time() - 20 * settings.TRENDING_HALF_LIFE)
+        trending.record(posts[1].id, None, 1)
+        assert trending.prune() == 1
+        assert list(TrendingScore.objects.values_list('object_id', flat=True)) == [posts[1].id]
+
+
+class TestTrendingPages:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_lists_are_cached_until_refresh(self, client, posts):
+        trending.record(posts[0].id, posts[0].group_id, 1)
+        assert posts[0].text in client.get('/trending/').content.decode()
+
+        trending.record(posts[1].id, posts[1].group_id, 5)
+        content = client.get('/trending/').content.decode()
+        assert posts[1].text not in content, \
+            'Списки популярного должны браться из кэша, а не из базы'
+
+        call_command('refresh_trending', stdout=io.StringIO())
+        content = client.get('/trending/').content.decode()
+        assert content.index(posts[1].text) < content.index(posts[0].text), \
+            'Проверьте, что refresh_trending обновляет списки и страницы'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group_sidebar(self, client, posts):
+        trending.record(posts[1].id, posts[1].group_id, 1)
+        content = client.get(f'/group/{posts[0].group.slug}').content.decode()
+        assert 'Популярные сообщества' in content
+        assert f'/group/{posts[1].group.slug}' in content
+
+    def test_refresh_bumps_pages_only_on_change(self, db, posts):
+        trending.refresh('post')
+        generation = page_cache.generations([page_cache.TRENDING_POSTS])
+        trending.refresh('post')
+        assert page_cache.generations([page_cache.TRENDING_POSTS]) == generation
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_ranking_keeps_group_pages(self, client, posts):
+        url = f'/group/{posts[0].group.slug}'
+        client.get(url)
+        etag = client.get(url)['ETag']
+        trending.record(posts[0].id, None, 1)
+        trending.refresh('post')
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304, \
+            'Сдвиг популярных постов не должен сбрасывать страницы групп'
+        trending.record(posts[1].id, posts[1].group_id, 1)
+        trending.refresh('group')
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200, \
+            'Проверьте, что смена популярных сообществ сбрасывает страницы групп'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_page_lives_until_refresh(self, client, posts, settings,
+                                      monkeypatch):
+        trending.record(posts[0].id, posts[0].group_id, 1)
+        client.get('/trending/')
+        etag = client.get('/trending/')['ETag']
+        trending.record(posts[1].id, posts[1].group_id, 5)
+
+        now = time.time() + settings.TRENDING_REFRESH
+        monkeypatch.setattr(time, 'time', lambda: now)
+        cache.delete(trending._key('post'))
+        response = client.get('/trending/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, \
+            'Страница популярного должна жить не дольше TRENDING_REFRESH'
+        content = response.content.decode()
+        assert content.index(posts[1].text) < content.index(posts[0].text)
@@ -0,0 +1,98 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import OperationalError, connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+
+from posts import view_counts
+from posts.models import Post
+
+
+def views(post):
+    return Post.objects.get(pk=post.pk).views
+
+
+class TestViewCounts:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_flush_after_events(self, client, post, settings):
+        settings.VIEW_COUNTS_FLUSH_EVENTS = 3
+        url = f'/{post.author.username}/{post.id}/'
+        client.get(url)
+        client.get(url)
+        assert views(post) == 0, \
+            'Просмотры должны копиться в памяти до VIEW_COUNTS_FLUSH_EVENTS'
+        client.get(url)
+        assert views(post) == 3, \
+            'Проверьте запись буфера после VIEW_COUNTS_FLUSH_EVENTS просмотров'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_flush_after_seconds(self, client, post, settings):
+        settings.VIEW_COUNTS_FLUSH_SECONDS = 0
+        client.get(f'/{post.author.username}/{post.id}/')
+        assert views(post) == 1, \
+            'Проверьте запись буфера после VIEW_COUNTS_FLUSH_SECONDS секунд'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cached_and_missing_pages(self, client, post):
+        url = f'/{post.author.username}/{post.id}/'
+        client.get(url)
+        client.get(url)
+        client.get(f'/{post.author.username}/{post.id + 100}/')
+        assert view_counts.flush() == 1
+        assert views(post) == 2, \
+            'Ответы из кэша считаются, несуществующие посты — нет'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_batched_update(self, post, user):
+        other = Post.objects.create(text='Другой пост', author=user)
+        third = Post.objects.create(text='Третий пост', author=user)
+        for post_id in (post.id, post.id, other.id, other.id, third.id):
+            view_counts.add(post_id)
+        with CaptureQueriesContext(connection) as context:
+            assert view_counts.flush() == 3
+        updates = [q for q in context.captured_queries
+                   if q['sql'].startswith('UPDATE')]
+        assert len(updates) == 2, \
+            'Посты с одинаковым приращением должны писаться одним UPDATE'
+        assert [views(p) for p in (post, other, third)] == [2, 2, 1]
+        assert view_counts.flush() == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_views_in_feed(self, client, post, settings):
+        settings.PAGE_CACHE_TIMEOUT = 0
+        Post.objects.filter(pk=post.pk).update(views=7)
+        assert '7 просмотров' in client.get('/').content.decode(), \
+            'Проверьте, что число просмотров выводится в карточке поста'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_failed_flush_keeps_views(self, client, post, settings):
+        settings.VIEW_COUNTS_FLUSH_EVENTS = 1
+        settings.TRENDING_VIEW_SAMPLE_RATE = 1
+        url = f'/{post.author.username}/{post.id}/'
+
+        def locked(execute, sql, params, many, context):
+            if not sql.startswith('SELECT'):
+                raise OperationalError('database is locked')
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(locked):
+            assert client.get(url).status_code == 200, \
+                'Ошибка записи просмотров не должна ломать страницу'
+        assert views(post) == 0
+        assert view_counts.flush() == 1
+        assert views(post) == 1, \
+            'Просмотры из неудавшейся записи должны вернуться в буфер'
+
+    @pytest.mark.urls('tests.async_urls')
+    @pytest.mark.django_db(transaction=True)
+    def test_async_view(self, post, settings):
+        settings.VIEW_COUNTS_FLUSH_EVENTS = 1
+        url = f'/{post.author.username}/{post.id}/'
+
+        async def get():
+            return await AsyncClient().get(url)
+
+        assert async_to_sync(get)().status_code == 200
+        assert views(post) == 1, \
+            'Проверьте подсчёт просмотров в асинхронной вьюхе'
@@ -0,0 +1,36 @@
+"""Бэкенд аутентификации, который берёт пользователя сессии из кэша.
+
+``AuthenticationMiddleware`` на каждом запросе загружает пользователя по
+id из сессии. ``CachedModelBackend`` хранит его в кэше
+``USER_CACHE_TIMEOUT`` секунд; запись удаляется при сохранении и удалении
+пользователя и при выходе (см. ``users.signals``). Смена пароля тоже
+сохраняет пользователя, поэтому проверка хэша сессии не увидит старый
+пароль.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def cache_key(user_id):
+    return f"auth_user:{user_id}"
+
+
+def timeout():
+    return getattr(settings, "USER_CACHE_TIMEOUT", 60 * 15)
+
+
+def forget(user_id):
+    cache.delete(cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, timeout())
+            return user
+        return user if self.user_can_authenticate(user) else None